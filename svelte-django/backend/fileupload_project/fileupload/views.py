@@ -19,10 +19,16 @@ from django.db import transaction
 
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
 
+# The worker client only uses the standard library; retrievals is imported as a namespace package of BASE_DIR
+from retrievals.worker_client import WorkerClient, WorkerUnavailable, WorkerError
+
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Score threshold of the analysis; the runner drops lower results up front since the analysis would ignore them
+ANALYSIS_MIN_THRESHOLD = 10
+
 @csrf_exempt
 @require_http_methods(["DELETE"])
 def delete_file(request):
@@ -385,6 +391,63 @@ def check_processing_status(request):
 
 
 
+def retrieval_worker():
+    return WorkerClient(settings.RETRIEVAL_WORKER_SOCKET)
+
+
+def run_initial_processor(documents_path, output_dir, options):
+    """Runs process.py in a subprocess and returns the path of the extracted data, or None on failure."""
+    initial_processor_command = [
+        'python3',
+        os.path.join(settings.BASE_DIR, 'retrievals', 'documentretriever', 'process.py'),
+        documents_path,
+        '--output-dir', output_dir,
+    ]
+    for option, value in options.items():
+        initial_processor_command += ['--' + option.replace('_', '-'), str(value)]
+
+    logger.debug(f"Running command: {' '.join(initial_processor_command)}")
+    try:
+        process = subprocess.run(initial_processor_command, check=True, capture_output=True, text=True)
+        logger.debug(f"Process output: {process.stdout}")
+        logger.debug(f"Process error: {process.stderr}")
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error running initial processor: {e}")
+        logger.error(f"Process output: {e.output}")
+        logger.error(f"Process error: {e.stderr}")
+        return None
+
+    output_lines = process.stdout.strip().split('\n')
+    for line in output_lines:
+        if line.startswith("Files have been saved to"):
+            return line.split("Files have been saved to")[-1].strip()
+    return None
+
+
+def run_runner(output_file_path, runner_output_dir, methods):
+    """Runs runner.py in a subprocess and returns whether it succeeded."""
+    runner_command = [
+        'python3',
+        os.path.join(settings.BASE_DIR, 'retrievals', 'runner.py'),
+        '--processed_docs', output_file_path,
+        '--method', *methods,
+        '--k', '5',
+        '--min_threshold', str(ANALYSIS_MIN_THRESHOLD),
+        '--output_dir', runner_output_dir,
+        '--mmap_index'
+    ]
+
+    logger.debug(f"Running runner command: {' '.join(runner_command)}")
+    try:
+        subprocess.run(runner_command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error running runner: {e}")
+        logger.error(f"Process output: {e.output}")
+        logger.error(f"Process error: {e.stderr}")
+        return False
+    return True
+
+
 @transaction.atomic
 def process_project_documents(project_id):
     logger.debug(f"process_project_documents called with project_id: {project_id}")
@@ -398,37 +461,27 @@ def process_project_documents(project_id):
         output_dir = os.path.join(project_path, 'sys', 'temp')
         os.makedirs(output_dir, exist_ok=True)
 
-        initial_processor_command = [
-            'python3',
-            os.path.join(settings.BASE_DIR, 'retrievals', 'documentretriever', 'process.py'),
-            documents_path,
-            '--min-chars', '100',
-            '--min-words', '30',
-            '--output-dir', output_dir
-        ]
+        process_options = {
+            'min_chars': 100,
+            'min_words': 30,
+            'workers': os.cpu_count() or 1,
+            'pdf_engine': 'auto',
+            'file_timeout': 600,
+            'max_rss_mb': 4096,
+            'dedup': 'near',
+        }
 
-        
-        logger.debug(f"Running command: {' '.join(initial_processor_command)}")
+        # The retrieval worker keeps the models loaded; without one, each step runs in a fresh interpreter
         try:
-            process = subprocess.run(initial_processor_command, check=True, capture_output=True, text=True)
-            logger.debug(f"Process output: {process.stdout}")
-            logger.debug(f"Process error: {process.stderr}")
-        except subprocess.CalledProcessError as e:
+            summary = retrieval_worker().run('process', on_log=logger.debug, folder_path=documents_path,
+                                             output_dir=output_dir, **process_options)
+            output_file_path = summary['output_file']
+        except WorkerUnavailable as e:
+            logger.debug(f"{e}; running the initial processor in a subprocess")
+            output_file_path = run_initial_processor(documents_path, output_dir, process_options)
+        except WorkerError as e:
             logger.error(f"Error running initial processor: {e}")
-            logger.error(f"Process output: {e.output}")
-            logger.error(f"Process error: {e.stderr}")
             return
-
-        
-        logger.debug(f"Process output: {process.stdout}")
-        logger.debug(f"Process error: {process.stderr}")
-
-        output_lines = process.stdout.strip().split('\n')
-        output_file_path = None
-        for line in output_lines:
-            if line.startswith("Files have been saved to"):
-                output_file_path = line.split("Files have been saved to")[-1].strip()
-                break
         
         if not output_file_path or not os.path.exists(output_file_path):
             logger.error(f"Output file not found: {output_file_path}")
@@ -448,22 +501,17 @@ def process_project_documents(project_id):
         runner_output_dir = os.path.join(output_dir, 'data')
         os.makedirs(runner_output_dir, exist_ok=True)
 
-        runner_command = [
-            'python3',
-            os.path.join(settings.BASE_DIR, 'retrievals', 'runner.py'),
-            '--processed_docs', output_file_path,
-            '--method', 'bm25', 'tfidf', 'flash', 'lunr', 'fuzz', 'embedding', 'encoder', 'dpr',
-            '--k', '5',
-            '--output_dir', runner_output_dir
-        ]
-
-        logger.debug(f"Running runner command: {' '.join(runner_command)}")
+        methods = ['bm25', 'tfidf', 'flash', 'lunr', 'fuzz', 'embedding', 'encoder', 'dpr']
         try:
-            subprocess.run(runner_command, check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
+            retrieval_worker().run('retrieve', on_log=logger.debug, processed_docs=output_file_path,
+                                   methods=methods, k=5, output_dir=runner_output_dir,
+                                   min_threshold=ANALYSIS_MIN_THRESHOLD)
+        except WorkerUnavailable as e:
+            logger.debug(f"{e}; running the runner in a subprocess")
+            if not run_runner(output_file_path, runner_output_dir, methods):
+                return
+        except WorkerError as e:
             logger.error(f"Error running runner: {e}")
-            logger.error(f"Process output: {e.output}")
-            logger.error(f"Process error: {e.stderr}")
             return
 
         project.is_processing_complete = True
@@ -485,12 +533,23 @@ def run_analysis(project):
         analysis_output_path = os.path.join(settings.MEDIA_ROOT, project.name, 'sys', 'temp', 'data', 'analysis_output.json')
         project_folder = os.path.join(settings.MEDIA_ROOT, project.name)
 
+        try:
+            return retrieval_worker().run('analyse', on_log=logger.debug, file_path=retrieval_results_path,
+                                          output_path=analysis_output_path, project_folder=project_folder,
+                                          min_threshold=ANALYSIS_MIN_THRESHOLD)
+        except WorkerUnavailable as e:
+            logger.debug(f"{e}; running the analyser in a subprocess")
+        except WorkerError as e:
+            logger.error(f"Error running analysis for project {project.name}: {e}")
+            return None
+
         analysis_command = [
             'python',
             'retrievals/analyser.py',
             retrieval_results_path,
             analysis_output_path,
-            project_folder
+            project_folder,
+            '--min_threshold', str(ANALYSIS_MIN_THRESHOLD)
         ]
 
         logger.debug(f"Running analysis command: {' '.join(analysis_command)}")
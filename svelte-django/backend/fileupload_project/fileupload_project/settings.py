@@ -82,6 +82,10 @@ AUTH_USER_MODEL = 'fileupload.User'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Unix socket of the retrieval worker (retrievals/worker.py). When no worker listens on it,
+# the views run process.py, runner.py and analyser.py as subprocesses instead.
+RETRIEVAL_WORKER_SOCKET = os.environ.get('DOCUMENTRETRIEVER_WORKER_SOCKET', os.path.join(BASE_DIR, 'retrieval_worker.sock'))
+
 
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 
@@ -4,29 +4,48 @@ from collections import defaultdict
 from operator import itemgetter
 from typing import Dict
 import os
+import sys
 
-def load_extracted_data(project_folder):
-    extracted_data_path = os.path.join(project_folder, 'sys', 'temp', 'extracted_data.json')
-    with open(extracted_data_path, 'r') as f:
-        return {item['id']: item for item in json.load(f)}
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from documentretriever.documents_io import find_extracted_data, load_documents
+from documentretriever.scores import SCORE_SCALES
+
+def load_extracted_data(project_folder, doc_ids=None):
+    """Loads the extracted paragraphs of a project, keeping only doc_ids if given."""
+    extracted_data_path = find_extracted_data(os.path.join(project_folder, 'sys', 'temp'))
+    return {item['id']: item for item in load_documents(extracted_data_path, doc_ids)}
+
+def collect_doc_ids(data: Dict) -> set:
+    """Returns the IDs of every document that appears in the retrieval results."""
+    doc_ids = set()
+    for methods in data.values():
+        for results in methods.values():
+            for result in results:
+                for item in (result if isinstance(result, list) else [result]):
+                    doc_ids.add(int(item["id"]))
+    return doc_ids
 
 def load_clause_data(project_folder):
     clause_data_path = os.path.join(project_folder, '..', '..', 'retrievals', 'pastcod', 'output_two_columns.json')
     with open(clause_data_path, 'r') as f:
         return json.load(f)
 
+def rankings(results):
+    """The rankings of one method's results: a bare ranking (embedding, dpr, encoder) or a list of them."""
+    if results and isinstance(results[0], list):
+        return results
+    return [results]
+
 def preprocess_data(data: Dict) -> Dict:
-    methods_to_normalize = ['bm25', 'embedding', 'tfidf']
+    # Put every method on the 0-100 scale of --min_threshold; the runner applies the same scales
     for clause_index, methods in data.items():
         for method, results in methods.items():
-            if method in methods_to_normalize:
-                if isinstance(results[0], dict):  # For methods like 'embedding'
-                    for result in results:
-                        result['similarity'] *= 100
-                elif isinstance(results[0], list):  # For methods like 'bm25', 'tfidf'
-                    for result_list in results:
-                        for result in result_list:
-                            result['similarity'] *= 100
+            if method in SCORE_SCALES:
+                for result_list in rankings(results):
+                    for result in result_list:
+                        result['similarity'] *= SCORE_SCALES[method]
     return data
 
 def analyze_retrieval_results(data, top_m_methods, min_threshold, top_n_docs, min_frequency, extracted_data, clause_data):
@@ -34,14 +53,8 @@ def analyze_retrieval_results(data, top_m_methods, min_threshold, top_n_docs, mi
     
     for clause_id, methods in data.items():
         for method, results in methods.items():
-            if isinstance(results[0], dict):
-                result_list = [results]
-            elif isinstance(results[0], list):
-                result_list = results
-            else:
-                continue
-
-            for result_sublist in result_list:
+            # Results pruned by the runner's --min_threshold can be empty
+            for result_sublist in rankings(results):
                 for result in result_sublist:
                     doc_id = result["id"]
                     similarity = result["similarity"]
@@ -76,45 +89,52 @@ def analyze_retrieval_results(data, top_m_methods, min_threshold, top_n_docs, mi
         output[doc_id] = {
             "document_text": doc_data.get("text", ""),
             "document_source": doc_data.get("source", ""),
+            "document_sources": doc_data.get("sources", []),
             "frequency": info["frequency"],
             "clause_ids": clause_data_output
         }
 
     return output
 
-def main():
-    parser = argparse.ArgumentParser(description='Analyze JSON file for document frequencies and method scores.')
-    parser.add_argument('file_path', type=str, help='Path to the JSON file')
-    parser.add_argument('output_path', type=str, help='Path to save the output JSON file')
-    parser.add_argument('project_folder', type=str, help='Path to the project folder')
-    parser.add_argument('--min_frequency', type=int, default=1, help='Minimum frequency to include in results (default: 1)')
-    parser.add_argument('--top_m_methods', type=int, default=3, help='Top M methods to show for each clause (default: 3)')
-    parser.add_argument('--min_threshold', type=float, default=10, help='Minimum threshold for scores (default: 10)')
-    parser.add_argument('--top_n_docs', type=int, default=5, help='Number of top document IDs to present (default: 5)')
-    args = parser.parse_args()
-
-    with open(args.file_path, 'r') as f:
+def analyse(file_path, output_path, project_folder, min_frequency=1, top_m_methods=3, min_threshold=10, top_n_docs=5):
+    """Analyses the retrieval results in file_path, saves them to output_path and returns them."""
+    with open(file_path, 'r') as f:
         data = json.load(f)
 
-    extracted_data = load_extracted_data(args.project_folder)
-    clause_data = load_clause_data(args.project_folder)
+    # Only the paragraphs that were actually retrieved are kept in memory
+    extracted_data = load_extracted_data(project_folder, collect_doc_ids(data))
+    clause_data = load_clause_data(project_folder)
 
     preprocessed_data = preprocess_data(data)
 
     results = analyze_retrieval_results(
         preprocessed_data, 
-        args.top_m_methods, 
-        args.min_threshold, 
-        args.top_n_docs, 
-        args.min_frequency,
+        top_m_methods, 
+        min_threshold, 
+        top_n_docs, 
+        min_frequency,
         extracted_data,
         clause_data
     )
 
-    with open(args.output_path, 'w') as f:
+    with open(output_path, 'w') as f:
         json.dump(results, f, indent=2)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze JSON file for document frequencies and method scores.')
+    parser.add_argument('file_path', type=str, help='Path to the JSON file')
+    parser.add_argument('output_path', type=str, help='Path to save the output JSON file')
+    parser.add_argument('project_folder', type=str, help='Path to the project folder')
+    parser.add_argument('--min_frequency', type=int, default=1, help='Minimum frequency to include in results (default: 1)')
+    parser.add_argument('--top_m_methods', type=int, default=3, help='Top M methods to show for each clause (default: 3)')
+    parser.add_argument('--min_threshold', type=float, default=10, help='Minimum threshold for scores (default: 10)')
+    parser.add_argument('--top_n_docs', type=int, default=5, help='Number of top document IDs to present (default: 5)')
+    args = parser.parse_args()
 
+    analyse(args.file_path, args.output_path, args.project_folder, args.min_frequency,
+            args.top_m_methods, args.min_threshold, args.top_n_docs)
     print(f"Analysis complete. Results saved to {args.output_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_ann_index.py
+#
+# Recall and latency of the approximate FAISS index types against the exact flat baseline.
+#
+#   python3 benchmarks/bench_ann_index.py --vectors 200000 --queries 1000 --k 10
+#   python3 benchmarks/bench_ann_index.py --embeddings corpus_embeddings.npy --output ann_report.json
+#
+# Without --embeddings, a synthetic corpus of clustered 768-d vectors is generated (the shape of
+# sentence embeddings). Queries are perturbed corpus vectors, and recall@k is the fraction of the
+# flat index's top k that each index type also returns.
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import faiss
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'documentretriever', 'retrievers'))
+
+from index_factory import INDEX_TYPES, create_index
+
+def synthetic_embeddings(count, dimension, clusters, seed):
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.randint(0, clusters, size=count)] + 0.5 * rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_queries(embeddings, count, seed):
+    rng = np.random.RandomState(seed + 1)
+    queries = embeddings[rng.choice(len(embeddings), count, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    return np.ascontiguousarray(queries, dtype=np.float32)
+
+def recall_at_k(found, expected):
+    hits = sum(len(set(row) & set(expected_row)) for row, expected_row in zip(found, expected))
+    return hits / expected.size
+
+def benchmark(index_type, embeddings, queries, k):
+    start_time = time.perf_counter()
+    index = create_index(embeddings, index_type)
+    index.add(embeddings)
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    _, found = index.search(queries, k)
+    search_time = time.perf_counter() - start_time
+    size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+    return found, build_time, search_time, size_mb
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark approximate FAISS indexes against the flat baseline.")
+    parser.add_argument('--embeddings', type=str, help="Corpus embeddings as a .npy matrix (default: synthetic)")
+    parser.add_argument('--vectors', type=int, default=100000, help="Number of synthetic corpus vectors")
+    parser.add_argument('--dimension', type=int, default=768, help="Dimension of the synthetic vectors")
+    parser.add_argument('--clusters', type=int, default=200, help="Number of clusters in the synthetic corpus")
+    parser.add_argument('--queries', type=int, default=1000, help="Number of queries")
+    parser.add_argument('--k', type=int, default=10, help="Number of neighbours per query")
+    parser.add_argument('--types', type=str, nargs='+', default=[t for t in INDEX_TYPES if t != 'auto'],
+                        choices=INDEX_TYPES, help="Index types to compare with the flat baseline")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--output', type=str, help="Optional path of a JSON report")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        embeddings = np.ascontiguousarray(np.load(args.embeddings), dtype=np.float32)
+    else:
+        embeddings = synthetic_embeddings(args.vectors, args.dimension, args.clusters, args.seed)
+    queries = make_queries(embeddings, min(args.queries, len(embeddings)), args.seed)
+    print(f"Corpus: {embeddings.shape[0]} vectors of dimension {embeddings.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    expected, flat_build, flat_search, flat_size = benchmark('flat', embeddings, queries, args.k)
+    report = []
+    print(f"{'index':>10s} {'recall@k':>9s} {'build s':>9s} {'ms/query':>9s} {'speedup':>8s} {'size MB':>9s}")
+    for index_type in args.types:
+        if index_type == 'flat':
+            found, build_time, search_time, size_mb = expected, flat_build, flat_search, flat_size
+        else:
+            found, build_time, search_time, size_mb = benchmark(index_type, embeddings, queries, args.k)
+        row = {
+            "index": index_type,
+            "recall_at_k": recall_at_k(found, expected),
+            "build_seconds": build_time,
+            "ms_per_query": 1000 * search_time / len(queries),
+            "speedup": flat_search / search_time if search_time else float('inf'),
+            "size_mb": size_mb,
+        }
+        report.append(row)
+        print(f"{index_type:>10s} {row['recall_at_k']:9.3f} {build_time:9.2f} {row['ms_per_query']:9.3f} "
+              f"{row['speedup']:7.1f}x {size_mb:9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"vectors": int(embeddings.shape[0]), "dimension": int(embeddings.shape[1]),
+                       "queries": len(queries), "k": args.k, "results": report}, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
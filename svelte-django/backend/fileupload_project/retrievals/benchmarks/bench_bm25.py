@@ -0,0 +1,96 @@
+# benchmarks/bench_bm25.py
+#
+# Ranking parity and speed of the sparse-matrix BM25 retriever against cherche's BM25, which it replaces.
+#
+#   python3 benchmarks/bench_bm25.py --documents /path/to/sys/temp/extracted_data.jsonl --queries pastcod/output_two_columns.json
+#   python3 benchmarks/bench_bm25.py --paragraphs 20000 --query-count 500 --k 5 --output bm25_report.json
+#
+# Without --documents, a synthetic corpus is generated. --queries takes a clause file like
+# output_two_columns.json ({id: {"Clause": ...}}) or a text file with one query per line. The exit
+# code is 1 when fewer than --min-parity of the queries get exactly the same ranking as cherche.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cherche import retrieve
+from documentretriever.documents_io import load_documents
+from documentretriever.retrievers.bm25 import BM25Retriever
+
+def synthetic_corpus(paragraphs, query_count, seed):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10))) for _ in range(5000)]
+    documents = [{"id": i, "text": " ".join(rng.choice(vocabulary) for _ in range(rng.randint(30, 120)))}
+                 for i in range(paragraphs)]
+    queries = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 40))) for _ in range(query_count)]
+    return documents, queries
+
+def load_queries(file_path):
+    if file_path.endswith('.json'):
+        with open(file_path, 'r') as f:
+            clauses = json.load(f)
+        return [clause["Clause"] if isinstance(clause, dict) else str(clause) for clause in clauses.values()]
+    with open(file_path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def timed(function, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+def compare(expected, found):
+    identical = sum(1 for a, b in zip(expected, found) if [d["id"] for d in a] == [d["id"] for d in b])
+    same_sets = sum(1 for a, b in zip(expected, found) if {d["id"] for d in a} == {d["id"] for d in b})
+    score_diff = max((abs(float(d["similarity"]) - e["similarity"]) for a, b in zip(expected, found)
+                      for d, e in zip(a, b)), default=0.0)
+    return identical / len(expected), same_sets / len(expected), score_diff
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the sparse-matrix BM25 retriever with cherche's BM25.")
+    parser.add_argument('--documents', type=str, help="extracted_data.jsonl (or .json) of a project (default: synthetic)")
+    parser.add_argument('--queries', type=str, help="Clause JSON file or text file with one query per line (default: synthetic)")
+    parser.add_argument('--paragraphs', type=int, default=10000, help="Number of synthetic paragraphs")
+    parser.add_argument('--query-count', type=int, default=300, help="Number of synthetic queries")
+    parser.add_argument('--k', type=int, default=5, help="Number of results per query")
+    parser.add_argument('--batch-size', type=int, default=64, help="Queries scored per batch")
+    parser.add_argument('--min-parity', type=float, default=0.99, help="Fraction of identical rankings required to pass")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic corpus")
+    parser.add_argument('--output', type=str, help="Optional path of a JSON report")
+    args = parser.parse_args()
+
+    documents, queries = synthetic_corpus(args.paragraphs, args.query_count, args.seed)
+    if args.documents:
+        documents = load_documents(args.documents)
+    if args.queries:
+        queries = load_queries(args.queries)
+    print(f"Corpus: {len(documents)} paragraphs, {len(queries)} queries, k={args.k}")
+
+    baseline, baseline_build = timed(retrieve.BM25, key="id", on=["text"], documents=documents)
+    native, native_build = timed(BM25Retriever, key="id", on=["text"], documents=documents)
+    expected, baseline_search = timed(baseline, queries, k=args.k, batch_size=args.batch_size, tqdm_bar=False)
+    found, native_search = timed(native, queries, k=args.k, batch_size=args.batch_size)
+    identical, same_sets, score_diff = compare(expected, found)
+
+    print(f"{'':>10s} {'build s':>9s} {'ms/query':>9s}")
+    print(f"{'cherche':>10s} {baseline_build:9.2f} {1000 * baseline_search / len(queries):9.3f}")
+    print(f"{'native':>10s} {native_build:9.2f} {1000 * native_search / len(queries):9.3f}")
+    print(f"Identical rankings: {identical:.2%}, same top-{args.k} sets: {same_sets:.2%}, max score difference: {score_diff:.2e}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "paragraphs": len(documents), "queries": len(queries), "k": args.k,
+                "cherche": {"build_seconds": baseline_build, "search_seconds": baseline_search},
+                "native": {"build_seconds": native_build, "search_seconds": native_search},
+                "identical_rankings": identical, "same_top_k_sets": same_sets, "max_score_difference": score_diff,
+            }, f, indent=2)
+        print(f"Report saved to {args.output}")
+    sys.exit(0 if identical >= args.min_parity else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_import_time.py
+#
+# Guards the start-up cost of the command line entry points against import regressions.
+#
+#   python3 benchmarks/bench_import_time.py
+#   python3 benchmarks/bench_import_time.py --budget-scale 2 --output import_report.json
+#
+# Every scenario runs in a fresh interpreter under `python -X importtime`. A scenario fails when
+# its total import time exceeds its budget, or when it imports one of its forbidden modules
+# (for example torch in a sparse-only run). The exit code is 1 if any scenario fails.
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+RETRIEVALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DENSE_STACK = ['torch', 'faiss', 'sentence_transformers']
+
+SPARSE_RUN = """
+from documentretriever.unified_retriever import UnifiedRetriever
+documents = [{"id": i, "text": f"paragraph {i} about payment terms"} for i in range(50)]
+retriever = UnifiedRetriever(documents, load_existing=True)
+retriever.retrieve_batch({"q": "payment terms"}, ["bm25", "tfidf", "lunr", "fuzz", "flash"], k=3)
+"""
+
+# A project that has never been indexed, retrieved with sparse methods only through runner.main
+FRESH_SPARSE_RUN = """
+import json, os, tempfile
+import runner
+folder = tempfile.mkdtemp()
+processed_docs = os.path.join(folder, "extracted_data.jsonl")
+with open(processed_docs, "w") as f:
+    for i in range(50):
+        f.write(json.dumps({"id": i, "text": f"paragraph {i} about payment terms", "source": "terms.txt"}) + "\\n")
+with open(os.path.join(folder, "query.txt"), "w") as f:
+    f.write("payment terms")
+runner.main(processed_docs, ["bm25", "tfidf", "lunr", "fuzz", "flash"], 3, os.path.join(folder, "query.txt"), folder)
+"""
+
+# (name, code, budget in ms, forbidden top-level modules)
+SCENARIOS = [
+    ("runner.py", "import runner", 1000, DENSE_STACK + ['cherche']),
+    ("initial_processor.py", "import initial_processor", 1000, DENSE_STACK + ['cherche']),
+    ("analyser.py", "import analyser", 500, DENSE_STACK + ['cherche']),
+    ("process.py", "import sys; sys.path.insert(0, 'documentretriever'); import process", 1500, DENSE_STACK + ['cherche']),
+    ("sparse-only retrieval", SPARSE_RUN, 4000, DENSE_STACK),
+    ("sparse-only retrieval, new project", FRESH_SPARSE_RUN, 4000, DENSE_STACK),
+]
+
+def parse_importtime(stderr):
+    """Returns (total microseconds, {top-level module: cumulative microseconds}) from -X importtime output."""
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown by indentation; top-level imports have exactly one leading space
+        if not name.startswith('  '):
+            top_level[name.strip()] = top_level.get(name.strip(), 0) + int(cumulative)
+    return sum(top_level.values()), top_level
+
+def imported_modules(stderr):
+    return {line.split('|')[-1].strip() for line in stderr.splitlines() if line.startswith('import time:')}
+
+def run_scenario(code):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=RETRIEVALS_DIR,
+                            capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': RETRIEVALS_DIR})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}")
+    return result.stderr
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time and forbidden imports of the entry points.")
+    parser.add_argument('--budget-scale', type=float, default=1.0, help="Multiply every budget (e.g. 2 on slow machines)")
+    parser.add_argument('--top', type=int, default=5, help="Number of heaviest top-level imports to show per scenario")
+    parser.add_argument('--output', type=str, help="Optional path of a JSON report")
+    args = parser.parse_args()
+
+    report = []
+    failed = False
+    for name, code, budget_ms, forbidden in SCENARIOS:
+        budget_ms *= args.budget_scale
+        try:
+            stderr = run_scenario(code)
+        except RuntimeError as e:
+            print(f"FAIL {name}: {e}")
+            report.append({"scenario": name, "error": str(e)})
+            failed = True
+            continue
+
+        total_us, top_level = parse_importtime(stderr)
+        forbidden_found = sorted(set(forbidden) & imported_modules(stderr))
+        ok = total_us / 1000 <= budget_ms and not forbidden_found
+        failed = failed or not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {total_us / 1000:.0f} ms (budget {budget_ms:.0f} ms)"
+              + (f", forbidden imports: {', '.join(forbidden_found)}" if forbidden_found else ""))
+        heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for module, cumulative in heaviest:
+            print(f"       {cumulative / 1000:8.1f} ms  {module}")
+        report.append({"scenario": name, "import_ms": total_us / 1000, "budget_ms": budget_ms,
+                       "forbidden_imports": forbidden_found, "ok": ok,
+                       "heaviest": [{"module": m, "ms": c / 1000} for m, c in heaviest]})
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_merge_paragraphs.py
+#
+# Micro-benchmark of merge_short_paragraphs on a synthetic document made of many short lines
+# (the shape of spreadsheets exported to PDF and long bullet lists).
+#
+#   python3 benchmarks/bench_merge_paragraphs.py --lines 100000 --min-words 20 200 2000
+#
+# The previous implementation, which re-split the growing paragraph after every append, is kept
+# here as the baseline; both must produce identical output.
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'documentretriever'))
+
+from process import merge_short_paragraphs
+
+def merge_short_paragraphs_baseline(paragraphs, min_words=20):
+    merged_paragraphs = []
+    current_paragraph = ""
+
+    for paragraph in paragraphs:
+        if current_paragraph:
+            current_paragraph += " " + paragraph
+        else:
+            current_paragraph = paragraph
+
+        word_count = len(current_paragraph.split())
+        if word_count >= min_words:
+            merged_paragraphs.append(current_paragraph)
+            current_paragraph = ""
+
+    if current_paragraph:
+        merged_paragraphs.append(current_paragraph)
+
+    return merged_paragraphs
+
+def synthetic_lines(line_count, max_words_per_line, seed):
+    rng = random.Random(seed)
+    vocabulary = [f"cell{i}" for i in range(500)]
+    return [' '.join(rng.choices(vocabulary, k=rng.randint(1, max_words_per_line))) for _ in range(line_count)]
+
+def time_call(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merge_short_paragraphs on a synthetic document.")
+    parser.add_argument('--lines', type=int, default=100000, help="Number of short lines in the synthetic document")
+    parser.add_argument('--max-words-per-line', type=int, default=3, help="Maximum number of words per line")
+    parser.add_argument('--min-words', type=int, nargs='+', default=[20, 200, 2000], help="min_words values to benchmark")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the synthetic document")
+    args = parser.parse_args()
+
+    lines = synthetic_lines(args.lines, args.max_words_per_line, args.seed)
+    print(f"Synthetic document: {len(lines)} lines, {sum(len(line.split()) for line in lines)} words")
+    print(f"{'min_words':>10s} {'baseline s':>12s} {'linear s':>10s} {'speedup':>9s}")
+
+    for min_words in args.min_words:
+        expected, baseline_time = time_call(merge_short_paragraphs_baseline, lines, min_words)
+        merged, linear_time = time_call(merge_short_paragraphs, lines, min_words)
+        if merged != expected:
+            print(f"Error: outputs differ for min_words={min_words}")
+            sys.exit(1)
+        speedup = baseline_time / linear_time if linear_time else float('inf')
+        print(f"{min_words:10d} {baseline_time:12.3f} {linear_time:10.3f} {speedup:8.1f}x")
+
+if __name__ == "__main__":
+    main()
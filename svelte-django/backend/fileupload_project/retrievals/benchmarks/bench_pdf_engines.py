@@ -0,0 +1,91 @@
+# benchmarks/bench_pdf_engines.py
+#
+# Compares throughput and paragraph parity of the PDF engines in documentretriever/process.py.
+#
+#   python3 benchmarks/bench_pdf_engines.py /path/to/fixture/pdfs --engines pdfplumber pdfium auto
+#
+# pdfplumber is the reference engine: parity is reported as the number of paragraphs per engine
+# and the word overlap (multiset Jaccard) between each engine's text and pdfplumber's text.
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'documentretriever'))
+
+from process import PDF_ENGINES, count_pdf_pages, extract_paragraphs_from_pdf
+
+def word_overlap(reference, candidate):
+    reference_words = Counter(' '.join(reference).lower().split())
+    candidate_words = Counter(' '.join(candidate).lower().split())
+    union = sum((reference_words | candidate_words).values())
+    if not union:
+        return 1.0
+    return sum((reference_words & candidate_words).values()) / union
+
+def benchmark(pdf_paths, engines, repeats):
+    report = {engine: {"seconds": 0.0, "pages": 0, "paragraphs": 0, "overlap": []} for engine in engines}
+    for pdf_path in pdf_paths:
+        page_count = count_pdf_pages(pdf_path, 'pdfium')
+        reference = extract_paragraphs_from_pdf(pdf_path, engine='pdfplumber')
+        for engine in engines:
+            start_time = time.perf_counter()
+            for _ in range(repeats):
+                paragraphs = extract_paragraphs_from_pdf(pdf_path, engine=engine)
+            elapsed = (time.perf_counter() - start_time) / repeats
+
+            overlap = word_overlap(reference, paragraphs)
+            report[engine]["seconds"] += elapsed
+            report[engine]["pages"] += page_count
+            report[engine]["paragraphs"] += len(paragraphs)
+            report[engine]["overlap"].append(overlap)
+            print(f"{os.path.basename(pdf_path):40.40s} {engine:10s} {page_count:5d} pages "
+                  f"{elapsed:8.3f}s {len(paragraphs):6d} paragraphs  overlap {overlap:.3f}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction engines on a fixture corpus.")
+    parser.add_argument('fixture_dir', type=str, help="Folder containing the fixture PDFs")
+    parser.add_argument('--engines', nargs='+', choices=PDF_ENGINES, default=list(PDF_ENGINES), help="Engines to compare")
+    parser.add_argument('--repeats', type=int, default=1, help="Number of timed runs per file and engine")
+    parser.add_argument('--output', type=str, help="Optional path to write the summary as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pdf_paths = sorted(
+        os.path.join(root, file_name)
+        for root, _, files in os.walk(args.fixture_dir)
+        for file_name in files if file_name.lower().endswith('.pdf')
+    )
+    if not pdf_paths:
+        print(f"Error: no PDF files found in '{args.fixture_dir}'")
+        sys.exit(1)
+
+    report = benchmark(pdf_paths, args.engines, args.repeats)
+
+    summary = {}
+    print()
+    print(f"{'engine':10s} {'pages/s':>10s} {'total s':>10s} {'paragraphs':>11s} {'mean overlap':>13s}")
+    for engine, stats in report.items():
+        summary[engine] = {
+            "pages_per_second": stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0,
+            "total_seconds": stats["seconds"],
+            "paragraphs": stats["paragraphs"],
+            "mean_overlap": sum(stats["overlap"]) / len(stats["overlap"]),
+            "min_overlap": min(stats["overlap"]),
+        }
+        print(f"{engine:10s} {summary[engine]['pages_per_second']:10.1f} {stats['seconds']:10.2f} "
+              f"{stats['paragraphs']:11d} {summary[engine]['mean_overlap']:13.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
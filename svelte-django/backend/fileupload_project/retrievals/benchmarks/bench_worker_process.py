@@ -0,0 +1,94 @@
+# benchmarks/bench_worker_process.py
+#
+# Compares the extraction of a folder through the retrieval worker's process job with the process.py
+# command line, both with the options the views pass (one worker per core, a file timeout and a memory
+# limit, so every file is extracted in a supervised worker process).
+#
+#   python3 benchmarks/bench_worker_process.py /path/to/documents
+#   python3 benchmarks/bench_worker_process.py --files 60 --max-ratio 2 --output worker_report.json
+#
+# Without a folder, --files small text files are generated. The exit code is 1 when the worker's
+# warm run is more than --max-ratio times slower than the command line.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+RETRIEVALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(RETRIEVALS_DIR)
+
+from worker_client import WorkerClient
+
+def write_fixtures(folder, files):
+    for i in range(files):
+        with open(os.path.join(folder, f"document_{i}.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(f"Paragraph {j} of document {i} sets out the obligations of the supplier under "
+                                f"the framework agreement, with the notice periods that apply to clause {j}."
+                                for j in range(5)))
+
+def time_cli(folder, output_dir, options):
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(RETRIEVALS_DIR, 'documentretriever', 'process.py'), folder,
+                    '--output-dir', output_dir, '--workers', str(options["workers"]),
+                    '--file-timeout', str(options["file_timeout"]), '--max-rss-mb', str(options["max_rss_mb"]),
+                    '--no-cache'], capture_output=True, check=True)
+    return time.perf_counter() - start_time
+
+def time_worker(client, folder, output_dir, options):
+    start_time = time.perf_counter()
+    client.run("process", folder_path=folder, output_dir=output_dir, use_cache=False, **options)
+    return time.perf_counter() - start_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the worker's process job with the process.py command line.")
+    parser.add_argument('folder', nargs='?', help="Folder of documents (default: generated text files)")
+    parser.add_argument('--files', type=int, default=60, help="Number of generated files when no folder is given")
+    parser.add_argument('--repeats', type=int, default=2, help="Runs of each path; the first worker run starts its forkserver")
+    parser.add_argument('--max-ratio', type=float, default=2.0, help="Largest accepted worker / command line time ratio")
+    parser.add_argument('--output', type=str, help="Optional path of a JSON report")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    folder = args.folder
+    if not folder:
+        folder = os.path.join(tmp.name, 'documents')
+        os.makedirs(folder)
+        write_fixtures(folder, args.files)
+    # The views' defaults, see fileupload/views.py
+    options = {"workers": os.cpu_count() or 1, "file_timeout": 600, "max_rss_mb": 4096}
+
+    socket_path = os.path.join(tmp.name, 'worker.sock')
+    worker = subprocess.Popen([sys.executable, os.path.join(RETRIEVALS_DIR, 'worker.py'), '--socket', socket_path,
+                               '--no_preload'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = WorkerClient(socket_path)
+    try:
+        deadline = time.monotonic() + 60
+        while not client.is_available():
+            if worker.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit("The retrieval worker did not start")
+            time.sleep(0.2)
+        worker_times = [time_worker(client, folder, tempfile.mkdtemp(dir=tmp.name), options) for _ in range(args.repeats)]
+    finally:
+        worker.terminate()
+        worker.wait()
+    cli_times = [time_cli(folder, tempfile.mkdtemp(dir=tmp.name), options) for _ in range(args.repeats)]
+
+    ratio = min(worker_times) / min(cli_times)
+    ok = ratio <= args.max_ratio
+    print(f"worker process job: {', '.join(f'{t:.2f}s' for t in worker_times)}")
+    print(f"process.py        : {', '.join(f'{t:.2f}s' for t in cli_times)}")
+    print(f"{'ok  ' if ok else 'FAIL'} worker / command line: {ratio:.2f} (max {args.max_ratio})")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"options": options, "worker_seconds": worker_times, "cli_seconds": cli_times,
+                       "ratio": ratio, "ok": ok}, f, indent=2)
+        print(f"Report saved to {args.output}")
+    tmp.cleanup()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#  documentretriever/dedup.py
+
+import re
+import zlib
+import hashlib
+import numpy as np
+
+DEDUP_MODES = ('off', 'exact', 'near')
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+class ParagraphDeduplicator:
+    """
+    Finds paragraphs that repeat across (or within) documents, such as T&Cs, headers and
+    signature blocks.
+
+    Every paragraph is first looked up by the hash of its normalized text (lowercased,
+    punctuation and whitespace removed). In 'near' mode a MinHash signature over word
+    shingles is also indexed with LSH banding, and candidates whose estimated Jaccard
+    similarity reaches `threshold` are treated as duplicates. The banding (32 bands of 4 rows)
+    is deliberately loose so that pairs near the threshold almost always become candidates;
+    precision comes from verifying candidates on the full signature.
+    """
+
+    def __init__(self, mode='exact', threshold=0.85, num_perm=128, bands=32, shingle_size=3, seed=1):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.mode = mode
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.exact_index = {}
+        self.band_buckets = [dict() for _ in range(bands)]
+        self.signatures = {}
+        self.sources = {}
+        self.duplicates = 0
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    @staticmethod
+    def _tokens(text):
+        return _TOKEN_PATTERN.findall(text.lower())
+
+    def _signature(self, tokens):
+        size = self.shingle_size
+        shingles = {' '.join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= _MERSENNE_PRIME
+        # a, b and h are all below p = 2**31 - 1, so a * h + b cannot overflow 64 bits
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def find(self, text):
+        """
+        Returns (canonical_id, keys). canonical_id is the ID of the paragraph that text duplicates,
+        or None if it is new; keys must then be passed to add() once the paragraph has an ID.
+        """
+        tokens = self._tokens(text)
+        if self.mode == 'off' or not tokens:
+            return None, None
+        exact_key = hashlib.sha1(' '.join(tokens).encode('utf-8')).hexdigest()
+        canonical_id = self.exact_index.get(exact_key)
+        if canonical_id is not None or self.mode == 'exact':
+            return canonical_id, (exact_key, None)
+
+        signature = self._signature(tokens)
+        band_keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+        candidates = set()
+        for buckets, band_key in zip(self.band_buckets, band_keys):
+            candidates.update(buckets.get(band_key, ()))
+        # Verify candidates on the full signature and pick the lowest (earliest) ID for determinism
+        for candidate_id in sorted(candidates):
+            if np.mean(self.signatures[candidate_id] == signature) >= self.threshold:
+                return candidate_id, (exact_key, None)
+        return None, (exact_key, (signature, band_keys))
+
+    def add(self, paragraph_id, source, keys):
+        """Registers a new canonical paragraph using the keys returned by find()."""
+        if keys is None:
+            return
+        exact_key, near_keys = keys
+        self.exact_index[exact_key] = paragraph_id
+        self.sources[paragraph_id] = {source}
+        if near_keys is not None:
+            signature, band_keys = near_keys
+            self.signatures[paragraph_id] = signature
+            for buckets, band_key in zip(self.band_buckets, band_keys):
+                buckets.setdefault(band_key, []).append(paragraph_id)
+
+    def add_source(self, paragraph_id, source):
+        """Records that paragraph_id also occurs in source. Returns False if that source was already known."""
+        self.duplicates += 1
+        known = self.sources.setdefault(paragraph_id, set())
+        if source in known:
+            return False
+        known.add(source)
+        return True
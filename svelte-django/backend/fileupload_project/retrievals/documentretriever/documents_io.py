@@ -0,0 +1,104 @@
+#  documentretriever/documents_io.py
+
+import os
+import json
+import logging
+
+EXTRACTED_DATA_NAMES = ('extracted_data.jsonl', 'extracted_data.json')
+
+class DocumentWriter:
+    """
+    Incrementally writes paragraph records.
+
+    A .jsonl path gets one JSON object per line; any other path gets a JSON array that
+    is streamed element by element. Call flush() after each file so that the records of
+    every finished file are on disk even if the run crashes later on. paragraphs and
+    duplicates count the paragraph records and the {"duplicate_of": ...} records written.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.jsonl = file_path.endswith('.jsonl')
+        self.records = 0
+        self.paragraphs = 0
+        self.duplicates = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.file_path, 'w', encoding='utf-8')
+        if not self.jsonl:
+            self._file.write('[')
+        return self
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        if self.jsonl:
+            self._file.write(line + '\n')
+        else:
+            self._file.write(('\n  ' if self.records == 0 else ',\n  ') + line)
+        self.records += 1
+        if 'duplicate_of' in record:
+            self.duplicates += 1
+        else:
+            self.paragraphs += 1
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.jsonl:
+            self._file.write('\n]\n' if self.records else ']\n')
+        self._file.close()
+        self._file = None
+
+def iter_records(file_path):
+    """
+    Lazily yields every record of an extracted data file.
+    JSON Lines files are read one line at a time; legacy JSON arrays are loaded in one go.
+    """
+    if not file_path.endswith('.jsonl'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # A crash mid-write can leave a truncated last line; keep everything before it
+                logging.warning(f"Skipping malformed line {line_number} in {file_path}: {e}")
+
+def iter_documents(file_path):
+    """Lazily yields the paragraphs of an extracted data file, skipping {"duplicate_of": ...} records."""
+    for record in iter_records(file_path):
+        if 'duplicate_of' not in record:
+            yield record
+
+def load_documents(file_path, doc_ids=None):
+    """
+    Loads the paragraphs of an extracted data file (only doc_ids, if given) and folds the
+    sources of duplicate records into the "sources" list of their canonical paragraph.
+    """
+    documents = {}
+    for record in iter_records(file_path):
+        if 'duplicate_of' in record:
+            canonical = documents.get(record['duplicate_of'])
+            if canonical is not None and record['source'] not in canonical['sources']:
+                canonical['sources'].append(record['source'])
+        elif doc_ids is None or record['id'] in doc_ids:
+            record.setdefault('sources', [record['source']])
+            documents[record['id']] = record
+    return list(documents.values())
+
+def find_extracted_data(directory):
+    """Returns the path of the extracted data file in directory, preferring JSON Lines over legacy JSON."""
+    for name in EXTRACTED_DATA_NAMES:
+        candidate = os.path.join(directory, name)
+        if os.path.exists(candidate):
+            return candidate
+    return os.path.join(directory, EXTRACTED_DATA_NAMES[0])
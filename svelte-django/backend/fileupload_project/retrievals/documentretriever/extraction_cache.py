@@ -0,0 +1,133 @@
+#  documentretriever/extraction_cache.py
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+class ExtractionCache:
+    """
+    Persistent per-file cache of extracted (and merged) paragraphs.
+
+    Entries are keyed by the SHA-256 of the file bytes combined with the extractor
+    version and the --min-words setting, so a renamed file is still a hit while an
+    edited file, a new extractor or a different merge threshold is always a miss.
+
+    The cache directory can be shared by several projects. Each source folder has a
+    manifest of the keys its last run used, and pruning only removes the entries that
+    folder no longer uses and no other folder's manifest lists.
+    """
+
+    def __init__(self, cache_dir, extractor_version, min_words):
+        self.cache_dir = cache_dir
+        self.extractor_version = str(extractor_version)
+        self.min_words = min_words
+        self.hits = 0
+        self.misses = 0
+        self.used_keys = set()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        logging.info(f"Using extraction cache: {self.cache_dir}")
+
+    @staticmethod
+    def hash_file(file_path, chunk_size=1024 * 1024):
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def key_for(self, file_path):
+        file_hash = self.hash_file(file_path)
+        key_source = f"{file_hash}:{self.extractor_version}:{self.min_words}"
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _manifest_dir(self):
+        return os.path.join(self.cache_dir, 'folders')
+
+    def _manifest_path(self, folder_path):
+        folder_hash = hashlib.sha256(os.path.realpath(folder_path).encode('utf-8')).hexdigest()
+        return os.path.join(self._manifest_dir(), f"{folder_hash}.json")
+
+    @staticmethod
+    def _read_manifest(manifest_path):
+        """Returns the keys listed by a folder manifest, or an empty set if it is missing or unreadable."""
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return set(json.load(f)['keys'])
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable cache manifest {manifest_path}: {e}")
+            return set()
+
+    def _write_json(self, path, data):
+        # Write to a temporary file first so a crash never leaves a truncated file behind
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key):
+        """Returns the cached paragraphs for key, or None on a miss."""
+        self.used_keys.add(key)
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable cache entry {entry_path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['paragraphs']
+
+    def put(self, key, file_path, paragraphs):
+        self.used_keys.add(key)
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        entry = {
+            "extractor_version": self.extractor_version,
+            "min_words": self.min_words,
+            "source": os.path.basename(file_path),
+            "paragraphs": paragraphs
+        }
+        self._write_json(entry_path, entry)
+
+    def prune(self, folder_path):
+        """
+        Records the keys this run used for folder_path, and removes the entries the folder's
+        previous run used but this one did not (deleted or modified files), unless another
+        folder's manifest still lists them. Entries of other folders are never touched.
+        """
+        manifest_path = self._manifest_path(folder_path)
+        stale = self._read_manifest(manifest_path) - self.used_keys
+        if stale:
+            for file_name in os.listdir(self._manifest_dir()):
+                other_path = os.path.join(self._manifest_dir(), file_name)
+                if file_name.endswith('.json') and other_path != manifest_path:
+                    stale -= self._read_manifest(other_path)
+
+        os.makedirs(self._manifest_dir(), exist_ok=True)
+        self._write_json(manifest_path, {"folder": os.path.realpath(folder_path), "keys": sorted(self.used_keys)})
+
+        removed = 0
+        for key in stale:
+            try:
+                os.remove(self._entry_path(key))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logging.info(f"Pruned {removed} stale extraction cache entries")
+        return removed
@@ -2,30 +2,29 @@ import json
 import os
 import sys
 import logging
+from documents_io import iter_documents
 
 def setup_logging():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def load_documents(json_output_path):
-    """Loads and validates documents from the JSON file."""
+    """Validates the documents of the extracted data file one record at a time and returns their count."""
     if not os.path.exists(json_output_path):
         logging.error(f"Data file not found: {json_output_path}")
         return None
 
     try:
-        with open(json_output_path, 'r') as file:
-            data = json.load(file)
-            
-            if isinstance(data, dict) and 'error' in data:
-                logging.error(f"Process error: {data['error']}")
-                return None
-            
-            if not isinstance(data, list) or any(not isinstance(d, dict) for d in data):
+        count = 0
+        for document in iter_documents(json_output_path):
+            if not isinstance(document, dict):
                 logging.error("Invalid JSON format. Expected a list of dictionaries.")
                 return None
-            
-            return data
-    except json.JSONDecodeError as e:
+            if 'error' in document:
+                logging.error(f"Process error: {document['error']}")
+                return None
+            count += 1
+        return count
+    except (json.JSONDecodeError, TypeError) as e:
         logging.error(f"JSON decoding error: {e}")
         return None
 
@@ -44,9 +43,9 @@ def main():
         logging.info("No documents to load. Exiting gracefully.")
         sys.exit(0)
 
-    documents = load_documents(json_output_path)
-    if documents:
-        logging.info(f"Documents loaded successfully. {len(documents)} documents processed.")
+    document_count = load_documents(json_output_path)
+    if document_count:
+        logging.info(f"Documents loaded successfully. {document_count} documents processed.")
     else:
         logging.warning("No valid documents were loaded.")
 
@@ -1,28 +1,100 @@
 import os
-import json
+import time
 import argparse
 import logging
+from collections import namedtuple
+import unicodedata
 import pdfplumber
+import pypdfium2 as pdfium
 from docx import Document
 from odf.opendocument import load
 from odf.text import P
+from extraction_cache import ExtractionCache
+from documents_io import DocumentWriter
+from supervised_pool import SupervisedPool
+from dedup import DEDUP_MODES, ParagraphDeduplicator
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def extract_paragraphs_from_pdf(file_path):
+# Bump whenever a change to the extractors or the merge step alters their output,
+# so that paragraphs cached by an older version are not reused.
+EXTRACTOR_VERSION = "1"
+
+PDF_ENGINES = ('pdfplumber', 'pdfium', 'auto')
+
+def count_pdf_pages(file_path, engine='pdfplumber'):
+    try:
+        if engine == 'pdfplumber':
+            with pdfplumber.open(file_path) as pdf:
+                return len(pdf.pages)
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception as e:
+        logging.error(f"Error counting pages of .pdf file '{file_path}': {e}")
+        return 0
+
+def looks_like_garbage(text, max_bad_ratio=0.05, min_alnum_ratio=0.5):
+    """Heuristic for text layers that decode to replacement/control characters or symbol soup."""
+    chars = ''.join(text.split())
+    if not chars:
+        return False
+    bad = sum(1 for c in chars if c == '\ufffd' or unicodedata.category(c) in ('Cc', 'Co', 'Cs', 'Cn'))
+    alnum = sum(1 for c in chars if c.isalnum())
+    return bad / len(chars) > max_bad_ratio or alnum / len(chars) < min_alnum_ratio
+
+def iter_pdfplumber_page_texts(file_path, page_range=None):
+    pages = None if page_range is None else list(range(page_range[0] + 1, page_range[1] + 1))
+    with pdfplumber.open(file_path, pages=pages) as pdf:
+        for page in pdf.pages:
+            yield page.extract_text()
+
+def iter_pdfium_page_texts(file_path, page_range=None, fallback_on_garbage=False):
+    """
+    Yields the text of each page using pdfium's native text layer. With fallback_on_garbage,
+    pages whose text looks like garbage are re-extracted with pdfplumber.
+    """
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        start, end = page_range if page_range is not None else (0, len(pdf))
+        for index in range(start, end):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range().replace('\r\n', '\n').replace('\r', '\n').replace('\ufffe', '')
+            textpage.close()
+            page.close()
+            if fallback_on_garbage and looks_like_garbage(text):
+                logging.info(f"Falling back to pdfplumber for page {index + 1} of {file_path}")
+                text = next(iter_pdfplumber_page_texts(file_path, (index, index + 1)), '')
+            yield text
+    finally:
+        pdf.close()
+
+def extract_paragraphs_from_pdf(file_path, page_range=None, engine='pdfplumber'):
+    """
+    Extracts paragraphs from a PDF. page_range is an optional (start, end) tuple of 0-based page indexes.
+    engine is 'pdfplumber', 'pdfium' (fast native text layer) or 'auto' (pdfium with per-page pdfplumber fallback).
+    Errors are logged and re-raised, so that a failed page range fails its whole file instead of leaving a gap.
+    """
     paragraphs = []
+    location = file_path if page_range is None else f"{file_path} (pages {page_range[0] + 1}-{page_range[1]})"
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    # Improved paragraph splitting
-                    page_paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-                    paragraphs.extend(page_paragraphs)
-        logging.info(f"Successfully extracted {len(paragraphs)} paragraphs from PDF: {file_path}")
+        if engine == 'pdfplumber':
+            page_texts = iter_pdfplumber_page_texts(file_path, page_range)
+        else:
+            page_texts = iter_pdfium_page_texts(file_path, page_range, fallback_on_garbage=(engine == 'auto'))
+        for text in page_texts:
+            if text:
+                # Improved paragraph splitting
+                page_paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+                paragraphs.extend(page_paragraphs)
+        logging.info(f"Successfully extracted {len(paragraphs)} paragraphs from PDF: {location}")
     except Exception as e:
-        logging.error(f"Error reading .pdf file '{file_path}': {e}")
+        logging.error(f"Error reading .pdf file '{location}': {e}")
+        raise
     return paragraphs
 
 def extract_paragraphs_from_docx(file_path):
@@ -35,6 +107,8 @@ def extract_paragraphs_from_docx(file_path):
         logging.info(f"Successfully extracted {len(paragraphs)} paragraphs from DOCX: {file_path}")
     except Exception as e:
         logging.error(f"Error reading .docx file '{file_path}': {e}")
+        # Re-raised so that the file is reported as failed, and not cached, instead of looking empty
+        raise
     return paragraphs
 
 def extract_paragraphs_from_odt(file_path):
@@ -49,26 +123,28 @@ def extract_paragraphs_from_odt(file_path):
         logging.info(f"Successfully extracted {len(paragraphs)} paragraphs from ODT: {file_path}")
     except Exception as e:
         logging.error(f"Error reading .odt file '{file_path}': {e}")
+        raise
     return paragraphs
 
 def merge_short_paragraphs(paragraphs, min_words=20):
     merged_paragraphs = []
-    current_paragraph = ""
+    current_parts = []
+    current_word_count = 0
     
     for paragraph in paragraphs:
-        if current_paragraph:
-            current_paragraph += " " + paragraph
-        else:
-            current_paragraph = paragraph
-        
-        word_count = len(current_paragraph.split())
-        if word_count >= min_words:
-            merged_paragraphs.append(current_paragraph)
-            current_paragraph = ""
+        if not paragraph:
+            continue
+        # Keep a running word count and join once, instead of re-splitting an ever-growing string
+        current_parts.append(paragraph)
+        current_word_count += len(paragraph.split())
+        if current_word_count >= min_words:
+            merged_paragraphs.append(" ".join(current_parts))
+            current_parts = []
+            current_word_count = 0
     
     # Add any remaining text
-    if current_paragraph:
-        merged_paragraphs.append(current_paragraph)
+    if current_parts:
+        merged_paragraphs.append(" ".join(current_parts))
     
     return merged_paragraphs
 
@@ -81,101 +157,327 @@ def extract_paragraphs_from_txt(file_path):
         logging.info(f"Successfully extracted {len(paragraphs)} paragraphs from TXT: {file_path}")
     except Exception as e:
         logging.error(f"Error reading .txt file '{file_path}': {e}")
+        raise
     return paragraphs
 
 
 
-def extract_text_from_folder(folder_path, min_words):
-    output = []
+EXTRACTORS = {
+    '.pdf': extract_paragraphs_from_pdf,
+    '.docx': extract_paragraphs_from_docx,
+    '.odt': extract_paragraphs_from_odt,
+    '.txt': extract_paragraphs_from_txt,
+}
+
+def list_document_files(folder_path):
+    """Returns every file below folder_path, ordered by relative path so paragraph IDs are stable."""
+    file_paths = []
+    for root, _, files in os.walk(folder_path):
+        for file_name in files:
+            file_paths.append(os.path.join(root, file_name))
+    return sorted(file_paths, key=lambda path: os.path.relpath(path, folder_path))
+
+def is_supported_file(file_path):
+    return os.path.splitext(file_path)[1].lower() in EXTRACTORS
+
+def count_pdf_pages_supervised(file_paths, pool, pdf_engine='pdfplumber'):
+    """
+    Counts the pages of the PDFs among file_paths, each in a worker of the SupervisedPool, so that a
+    malformed PDF that hangs or crashes the PDF library cannot take down the run. A PDF whose pages
+    could not be counted gets 0 and is extracted as a single task, still under supervision.
+    """
+    pdf_paths = [file_path for file_path in file_paths if file_path.lower().endswith('.pdf')]
+    page_counts = {}
+    results = pool.imap(count_pdf_pages, [(file_path, pdf_engine) for file_path in pdf_paths])
+    for file_path, (ok, result) in zip(pdf_paths, results):
+        if not ok:
+            logging.error(f"Could not count the pages of {file_path} ({result}); extracting it as a single task")
+        page_counts[file_path] = result if ok else 0
+    return page_counts
+
+def plan_extraction_tasks(file_path, pages_per_task=None, page_count=0):
+    """
+    Splits a file into extraction tasks of (file_path, page_range).
+    PDFs longer than pages_per_task are split into page ranges so a single huge
+    specification can be spread over several workers; everything else is one task.
+    """
+    if pages_per_task and page_count > pages_per_task:
+        logging.info(f"Splitting {file_path} ({page_count} pages) into ranges of {pages_per_task} pages")
+        return [(file_path, (start, min(start + pages_per_task, page_count)))
+                for start in range(0, page_count, pages_per_task)]
+    return [(file_path, None)]
+
+def extract_task(task, pdf_engine='pdfplumber'):
+    """Extracts the raw paragraphs of one task. Runs inside the worker processes; each task opens the file itself."""
+    file_path, page_range = task
+    start_time = time.perf_counter()
+    if file_path.lower().endswith('.pdf'):
+        paragraphs = extract_paragraphs_from_pdf(file_path, page_range, pdf_engine)
+    else:
+        paragraphs = EXTRACTORS[os.path.splitext(file_path)[1].lower()](file_path)
+    return paragraphs, time.perf_counter() - start_time
+
+def run_task(task, pdf_engine='pdfplumber'):
+    """Runs extract_task in this process and returns (ok, result) like SupervisedPool.imap, with the error message on failure."""
+    try:
+        return True, extract_task(task, pdf_engine)
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+FileResult = namedtuple('FileResult', ['file_path', 'paragraphs', 'elapsed', 'from_cache', 'error'])
+
+def iter_extracted_files(file_paths, min_words, pool=None, pages_per_task=None, pdf_engine='pdfplumber'):
+    """
+    Yields a FileResult per file in the order of file_paths. With a SupervisedPool the
+    extraction tasks run in isolated worker processes; a task that fails, times out or
+    exceeds the memory limit marks its whole file as failed, so that a split PDF is never
+    merged and cached with a page range missing. Page ranges of a split PDF
+    are concatenated in page order before merging, so the output matches a serial run.
+    """
+    # Splitting only pays off with several workers, and the pages are only counted under supervision
+    page_counts = {}
+    if pool and pool.workers > 1 and pages_per_task:
+        page_counts = count_pdf_pages_supervised(file_paths, pool, pdf_engine)
+    tasks_per_file = [plan_extraction_tasks(file_path, pages_per_task, page_counts.get(file_path, 0))
+                      for file_path in file_paths]
+    tasks = [(task, pdf_engine) for file_tasks in tasks_per_file for task in file_tasks]
+
+    if pool:
+        results = pool.imap(extract_task, tasks)
+    else:
+        results = (run_task(*args) for args in tasks)
+
+    for file_path, file_tasks in zip(file_paths, tasks_per_file):
+        paragraphs = []
+        elapsed = 0.0
+        errors = []
+        for _ in file_tasks:
+            ok, result = next(results)
+            if not ok:
+                errors.append(result)
+                continue
+            task_paragraphs, task_elapsed = result
+            paragraphs.extend(task_paragraphs)
+            elapsed += task_elapsed
+        if errors:
+            yield FileResult(file_path, None, elapsed, False, '; '.join(errors))
+        else:
+            yield FileResult(file_path, merge_short_paragraphs(paragraphs, min_words), elapsed, False, None)
+
+def iter_folder_results(file_paths, min_words, pool=None, cache=None, pages_per_task=None, pdf_engine='pdfplumber'):
+    """
+    Yields a FileResult per file in the order of file_paths. paragraphs is None for
+    unsupported and failed files. Only files missing from the cache are extracted.
+    """
+    plan = []
+    pending = []
+    reused = 0
+    for file_path in file_paths:
+        if not is_supported_file(file_path):
+            plan.append((file_path, None, None))
+            continue
+        cache_key = cache.key_for(file_path) if cache else None
+        cached = cache.get(cache_key) if cache else None
+        plan.append((file_path, cache_key, cached))
+        if cached is None:
+            pending.append(file_path)
+        else:
+            reused += 1
+
+    if cache:
+        logging.info(f"Extraction cache: {reused} file(s) reused, {len(pending)} to extract")
+
+    extracted = iter_extracted_files(pending, min_words, pool, pages_per_task, pdf_engine)
+    for file_path, cache_key, cached in plan:
+        if not is_supported_file(file_path):
+            yield FileResult(file_path, None, 0.0, False, None)
+        elif cached is not None:
+            yield FileResult(file_path, cached, 0.0, True, None)
+        else:
+            result = next(extracted)
+            # Failed files are not cached so that the next run retries them
+            if cache and result.error is None:
+                cache.put(cache_key, file_path, result.paragraphs)
+            yield result
+
+def extract_text_from_folder(folder_path, min_words, writer, min_chars=0, pool=None, cache=None,
+                             pages_per_task=None, pdf_engine='pdfplumber', deduplicator=None):
+    """
+    Streams paragraph records to writer as each file finishes, in path order.
+    Paragraphs shorter than min_chars are not written but still consume an ID.
+    With a deduplicator, a paragraph that repeats an earlier one gets no ID of its own;
+    a {"duplicate_of": id, "source": file} record is written instead, which readers fold
+    into the "sources" of the canonical paragraph.
+    Returns (total_paragraphs, unsupported_files, failed_files).
+    """
     paragraph_id = 1
     unsupported_files = []
+    failed_files = []
+    file_timings = []
     
     logging.info(f"Extracting text from folder: {folder_path}")
     logging.info(f"Files in folder: {os.listdir(folder_path)}")
+    logging.info(f"Using {pool.workers if pool else 1} worker process(es), PDF engine: {pdf_engine}")
     
-    for root, _, files in os.walk(folder_path):
-        for file_name in files:
-            file_path = os.path.join(root, file_name)
-            logging.info(f"Processing file: {file_path}")
-            logging.info(f"File size: {os.path.getsize(file_path)} bytes")
-            
-            if file_name.lower().endswith('.pdf'):
-                paragraphs = extract_paragraphs_from_pdf(file_path)
-            elif file_name.lower().endswith('.docx'):
-                paragraphs = extract_paragraphs_from_docx(file_path)
-            elif file_name.lower().endswith('.odt'):
-                paragraphs = extract_paragraphs_from_odt(file_path)
-            elif file_name.lower().endswith('.txt'):
-                paragraphs = extract_paragraphs_from_txt(file_path)
-            else:
-                unsupported_files.append(file_name)
-                logging.warning(f"Skipping unsupported file format: {file_name}")
-                continue
+    start_time = time.perf_counter()
+    file_paths = list_document_files(folder_path)
+    for result in iter_folder_results(file_paths, min_words, pool, cache, pages_per_task, pdf_engine):
+        file_name = os.path.basename(result.file_path)
+        logging.info(f"Processing file: {result.file_path}")
+        logging.info(f"File size: {os.path.getsize(result.file_path)} bytes")
 
-            
-            merged_paragraphs = merge_short_paragraphs(paragraphs, min_words)
-            
-            for para in merged_paragraphs:
-                if para:
-                    output.append({
-                        "id": paragraph_id,
-                        "text": para,
-                        "source": file_name,
-                        "char_count": len(para),
-                        "word_count": len(para.split())
-                    })
-                    paragraph_id += 1
-    logging.info(f"Extracted and merged a total of {len(output)} paragraphs from all documents")
-    logging.info(f"Total paragraphs extracted: {len(output)}")
-    return output, unsupported_files
+        if result.error is not None:
+            failed_files.append((file_name, result.error))
+            logging.error(f"Failed to extract {file_name}: {result.error}")
+            continue
 
+        if result.paragraphs is None:
+            unsupported_files.append(file_name)
+            logging.warning(f"Skipping unsupported file format: {file_name}")
+            continue
 
-def main():
-    # Set up argument parsing
-    parser = argparse.ArgumentParser(description="Extract text from documents in a specified folder.")
-    parser.add_argument('folder_path', type=str, help="Path to the folder containing the documents")
-    parser.add_argument('--min-chars', type=int, default=0, help="Minimum number of characters for a paragraph to be included")
-    parser.add_argument('--min-words', type=int, default=20, help="Minimum number of words for a paragraph before merging")
-    parser.add_argument('--output-dir', type=str, help="Path to the output directory for extracted data")
-    args = parser.parse_args()
+        if result.from_cache:
+            logging.info(f"Reused {len(result.paragraphs)} cached paragraphs for {file_name}")
+        else:
+            logging.info(f"Extracted {len(result.paragraphs)} merged paragraphs from {file_name} in {result.elapsed:.2f}s")
+            file_timings.append((file_name, result.elapsed))
 
-    # Check if the provided path is a directory
-    if not os.path.isdir(args.folder_path):
-        logging.error(f"The provided path '{args.folder_path}' is not a valid directory.")
-        print(f"Error: The provided path '{args.folder_path}' is not a valid directory.")
-        return
+        # IDs are assigned here, after the results are merged back in path order
+        for para in result.paragraphs:
+            if not para:
+                continue
+            if len(para) < min_chars:
+                paragraph_id += 1
+                continue
+            canonical_id, dedup_keys = deduplicator.find(para) if deduplicator else (None, None)
+            if canonical_id is not None:
+                if deduplicator.add_source(canonical_id, file_name):
+                    writer.write({"duplicate_of": canonical_id, "source": file_name})
+                continue
+            writer.write({
+                "id": paragraph_id,
+                "text": para,
+                "source": file_name,
+                "sources": [file_name],
+                "char_count": len(para),
+                "word_count": len(para.split())
+            })
+            if deduplicator:
+                deduplicator.add(paragraph_id, file_name, dedup_keys)
+            paragraph_id += 1
+        writer.flush()
+
+    total_paragraphs = paragraph_id - 1
+    total_time = time.perf_counter() - start_time
+    cpu_time = sum(elapsed for _, elapsed in file_timings)
+    logging.info(f"Extracted and merged a total of {total_paragraphs} paragraphs from all documents")
+    logging.info(f"Total paragraphs extracted: {total_paragraphs}")
+    logging.info(f"Extraction took {total_time:.2f}s wall time, {cpu_time:.2f}s summed over files")
+    for file_name, elapsed in sorted(file_timings, key=lambda timing: timing[1], reverse=True)[:10]:
+        logging.info(f"  {elapsed:8.2f}s  {file_name}")
+    if deduplicator:
+        logging.info(f"Collapsed {deduplicator.duplicates} duplicate paragraphs ({deduplicator.mode} dedup)")
+    if cache:
+        cache.prune(folder_path)
+    return total_paragraphs, unsupported_files, failed_files
+
+
+def process_folder(folder_path, output_dir=None, min_chars=0, min_words=20, output_format='jsonl', workers=1,
+                   file_timeout=0, max_rss_mb=0, pdf_pages_per_task=50, pdf_engine='pdfplumber', dedup='off',
+                   dedup_threshold=0.85, cache_dir=None, use_cache=True):
+    """
+    Extracts the paragraphs of every document in folder_path to <output_dir>/extracted_data.<output_format>.
+    Returns a summary with the output file, paragraph counts, and the unsupported and failed files.
+    """
+    if not os.path.isdir(folder_path):
+        raise NotADirectoryError(f"The provided path '{folder_path}' is not a valid directory.")
 
     # Create the output directory if it does not exist
-    output_dir = args.output_dir if args.output_dir else os.path.join(args.folder_path, 'sys', 'temp')
+    output_dir = output_dir if output_dir else os.path.join(folder_path, 'sys', 'temp')
     os.makedirs(output_dir, exist_ok=True)
     logging.info(f"Created output directory: {output_dir}")
 
-    # Process the folder and extract text
-    documents, unsupported_files = extract_text_from_folder(args.folder_path, args.min_words)
+    cache = None
+    if use_cache:
+        cache_dir = cache_dir if cache_dir else os.path.join(output_dir, 'extraction_cache')
+        cache = ExtractionCache(cache_dir, f"{EXTRACTOR_VERSION}-{pdf_engine}", min_words)
 
-    # Filter paragraphs based on minimum character count
-    filtered_documents = [doc for doc in documents if doc['char_count'] >= args.min_chars]
+    # Extraction runs in supervised worker processes whenever it is parallel or limits are set
+    pool = None
+    if workers > 1 or file_timeout or max_rss_mb:
+        pool = SupervisedPool(workers, timeout=file_timeout, max_rss_mb=max_rss_mb)
 
-    # Write the extracted text data to a JSON file
-    output_file_path = os.path.join(output_dir, 'extracted_data.json')
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        json.dump(filtered_documents, f, indent=2, ensure_ascii=False)
-    logging.info(f"Wrote {len(filtered_documents)} paragraphs to {output_file_path}")
+    deduplicator = ParagraphDeduplicator(dedup, dedup_threshold) if dedup != 'off' else None
 
-    # Print the path to the JSON file
-    print(f"Files have been saved to {output_file_path}")
-    print(f"Total paragraphs extracted and merged: {len(documents)}")
-    print(f"Paragraphs after filtering (min {args.min_chars} chars): {len(filtered_documents)}")
+    # Process the folder and stream the paragraphs, filtered on minimum character count, to the output file
+    output_file_path = os.path.join(output_dir, f"extracted_data.{output_format}")
+    with DocumentWriter(output_file_path) as writer:
+        total_paragraphs, unsupported_files, failed_files = extract_text_from_folder(
+            folder_path, min_words, writer, min_chars, pool, cache,
+            pdf_pages_per_task, pdf_engine, deduplicator)
+    logging.info(f"Wrote {writer.paragraphs} paragraphs and {writer.duplicates} duplicate records to {output_file_path}")
 
-    # Print information about unsupported files
     if unsupported_files:
         logging.warning("The following files were skipped due to unsupported format:")
         for file in unsupported_files:
             logging.warning(f"  - {file}")
+    if failed_files:
+        logging.error("The following files could not be extracted:")
+        for file, error in failed_files:
+            logging.error(f"  - {file}: {error}")
+
+    return {
+        "output_file": output_file_path,
+        "total_paragraphs": total_paragraphs,
+        "paragraphs": writer.paragraphs,
+        "duplicates": writer.duplicates,
+        "unsupported_files": unsupported_files,
+        "failed_files": [[file, str(error)] for file, error in failed_files],
+    }
+
+
+def main():
+    # Set up argument parsing
+    parser = argparse.ArgumentParser(description="Extract text from documents in a specified folder.")
+    parser.add_argument('folder_path', type=str, help="Path to the folder containing the documents")
+    parser.add_argument('--min-chars', type=int, default=0, help="Minimum number of characters for a paragraph to be included")
+    parser.add_argument('--min-words', type=int, default=20, help="Minimum number of words for a paragraph before merging")
+    parser.add_argument('--output-dir', type=str, help="Path to the output directory for extracted data")
+    parser.add_argument('--output-format', choices=['jsonl', 'json'], default='jsonl', help="Write extracted_data as streamed JSON Lines (default) or as a single JSON array")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes used to extract files in parallel")
+    parser.add_argument('--file-timeout', type=float, default=0, help="Seconds after which the extraction of a file (or of one page range of a split PDF) is killed and the file recorded as failed (0 disables)")
+    parser.add_argument('--max-rss-mb', type=int, default=0, help="Resident memory ceiling in MB per extraction worker; workers above it are killed and the file recorded as failed (0 disables)")
+    parser.add_argument('--pdf-pages-per-task', type=int, default=50, help="PDFs with more pages than this are split into page ranges extracted in parallel (0 disables splitting)")
+    parser.add_argument('--pdf-engine', choices=PDF_ENGINES, default='pdfplumber', help="PDF text extraction engine; 'auto' uses pdfium and falls back to pdfplumber for garbled pages")
+    parser.add_argument('--dedup', choices=DEDUP_MODES, default='off', help="Collapse repeated paragraphs: 'exact' matches normalized text, 'near' also uses MinHash/LSH")
+    parser.add_argument('--dedup-threshold', type=float, default=0.85, help="Estimated Jaccard similarity at which 'near' dedup treats paragraphs as duplicates")
+    parser.add_argument('--cache-dir', type=str, help="Directory of the extraction cache (default: <output-dir>/extraction_cache)")
+    parser.add_argument('--no-cache', action='store_true', help="Re-extract every file instead of reusing cached paragraphs")
+    args = parser.parse_args()
+
+    try:
+        summary = process_folder(
+            args.folder_path, args.output_dir, args.min_chars, args.min_words, args.output_format, args.workers,
+            args.file_timeout, args.max_rss_mb, args.pdf_pages_per_task, args.pdf_engine, args.dedup,
+            args.dedup_threshold, args.cache_dir, not args.no_cache)
+    except NotADirectoryError as e:
+        logging.error(str(e))
+        print(f"Error: {e}")
+        return
+
+    # Print the path to the output file
+    print(f"Files have been saved to {summary['output_file']}")
+    print(f"Total paragraphs extracted and merged: {summary['total_paragraphs']}")
+    print(f"Paragraphs after filtering (min {args.min_chars} chars): {summary['paragraphs']}")
+    if summary["duplicates"]:
+        print(f"Duplicate paragraphs collapsed into their canonical paragraph: {summary['duplicates']}")
+
+    if summary["unsupported_files"]:
         print("Warning: Some files were skipped due to unsupported format. Check the log for details.")
+    if summary["failed_files"]:
+        print(f"Warning: {len(summary['failed_files'])} file(s) failed to extract. Check the log for details.")
 
 
 
 if __name__ == "__main__":
     main()
-
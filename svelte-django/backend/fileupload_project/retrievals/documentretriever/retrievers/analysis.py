@@ -0,0 +1,73 @@
+#  documentretriever/retrievers/analysis.py
+
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+import snowballstemmer
+from lunr.stop_word_filter import WORDS as LUNR_STOPWORDS
+
+# Bump whenever a change to the analysis alters its output, so that stored sparse indexes are rebuilt
+ANALYSIS_VERSION = 1
+ANALYZED_METHODS = ("bm25", "tfidf", "flash", "lunr", "fuzz")
+STOPWORDS = frozenset(LUNR_STOPWORDS)
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+MAX_CACHED_QUERIES = 100000
+
+class Analyzer:
+    """
+    The one text analysis shared by the sparse retrievers: Unicode normalization, lowercasing,
+    punctuation stripping, stopword removal and Snowball stemming. The corpus is analyzed once and
+    every sparse retriever indexes the result, so they all see the same terms. Query analyses and
+    word stems are memoized, so a query batch is analyzed once however many methods it runs through.
+    """
+
+    def __init__(self, language="english", stopwords=STOPWORDS, stem=True):
+        self.language = language
+        self.stopwords = frozenset(stopwords or ())
+        self.stem = stem
+        self._stemmer = snowballstemmer.stemmer(language) if stem else None
+        self._stems = {}
+        self._queries = {}
+        # Snowball stemmers keep state between calls, and query lanes analyze on their own threads
+        self._lock = threading.Lock()
+
+    def signature(self):
+        """Identifies the analysis, so that indexes built with a different one are not reused."""
+        stopwords = hashlib.sha1("\n".join(sorted(self.stopwords)).encode('utf-8')).hexdigest()
+        return {"version": ANALYSIS_VERSION, "language": self.language, "stem": self.stem, "stopwords": stopwords}
+
+    def tokens(self, text):
+        text = unicodedata.normalize("NFKC", text).lower()
+        words = [word for word in TOKEN_PATTERN.findall(text) if word not in self.stopwords]
+        if not self.stem:
+            return words
+        missing = [word for word in set(words) if word not in self._stems]
+        if missing:
+            with self._lock:
+                self._stems.update(zip(missing, self._stemmer.stemWords(missing)))
+        return [self._stems[word] for word in words]
+
+    def analyze(self, texts):
+        """Returns the analyzed form (space-joined terms) of one text or of a list of texts."""
+        if isinstance(texts, str):
+            return " ".join(self.tokens(texts))
+        analyzed = []
+        for text in texts:
+            # Other query lanes may clear the memo at any time, so the value is kept locally
+            terms = self._queries.get(text)
+            if terms is None:
+                terms = " ".join(self.tokens(text))
+                if len(self._queries) >= MAX_CACHED_QUERIES:
+                    self._queries.clear()
+                self._queries[text] = terms
+            analyzed.append(terms)
+        return analyzed
+
+    def analyze_documents(self, documents, key="id", on=["text"]):
+        """Returns one {key, "text"} record per document, holding the analyzed text of its `on` fields."""
+        analyzed = [{key: doc[key], "text": " ".join(self.tokens(" ".join(str(doc.get(field, "")) for field in on)))}
+                    for doc in documents]
+        logging.info(f"Analyzed {len(analyzed)} documents ({len(self._stems)} distinct words)")
+        return analyzed
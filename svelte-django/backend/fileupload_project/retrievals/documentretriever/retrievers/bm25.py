@@ -0,0 +1,71 @@
+#  documentretriever/retrievers/bm25.py
+
+import logging
+import numpy as np
+from scipy import sparse as sp
+from lenlp import sparse
+
+# Largest (queries x documents) block of dense scores, in floats, ranked at once
+MAX_DENSE_SCORES = 2 ** 24
+
+class BM25Retriever:
+    """
+    BM25 over a precomputed SciPy CSR matrix of term weights. Term saturation (k1), length
+    normalization (b), IDF and L2 normalization are applied once when the index is built, so a
+    batch of queries is scored with a single sparse matrix product followed by an argpartition top-k.
+
+    Terms are the character 3-5 grams within word boundaries that cherche's BM25 uses, and queries are
+    weighted the same way as documents, so scores are cosine similarities in [0, 1] and the rankings
+    match cherche's. Documents with a score of 0, or below min_score, are not returned.
+    """
+
+    def __init__(self, key, on, documents, k1=1.5, b=0.75, analyzer="char_wb", ngram_range=(3, 5)):
+        self.key = key
+        self.on = on if isinstance(on, list) else [on]
+        self.k1 = k1
+        self.b = b
+        self.ids = [doc[key] for doc in documents]
+        self.vectorizer = sparse.CountVectorizer(analyzer=analyzer, ngram_range=ngram_range, normalize=True)
+
+        counts = sp.csr_matrix(self.vectorizer.fit_transform(
+            [" ".join(str(doc.get(field, "")) for field in self.on) for doc in documents]), dtype=np.float32)
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        self.idf = np.log((len(documents) - document_frequency + 0.5) / (document_frequency + 0.5) + 1).astype(np.float32)
+        self.average_length = float(counts.sum(axis=1).mean()) if len(documents) else 0.0
+        # (terms x documents), so that queries @ matrix gives the (queries x documents) scores directly
+        self.matrix = self.weigh(counts).T.tocsr()
+
+    def __repr__(self):
+        return f"BM25 retriever\n\tkey      : {self.key}\n\ton       : {', '.join(self.on)}\n\tdocuments: {len(self.ids)}"
+
+    def weigh(self, counts):
+        """Turns a CSR matrix of term counts into L2-normalized BM25 weights."""
+        counts = counts.astype(np.float32, copy=True)
+        lengths = np.asarray(counts.sum(axis=1)).ravel()
+        saturation = self.k1 * (1 - self.b + self.b * lengths / max(self.average_length, 1e-9))
+        rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        counts.data = counts.data * (self.k1 + 1) / (counts.data + saturation[rows]) * self.idf[counts.indices]
+
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        counts.data /= np.maximum(norms, np.finfo(np.float32).tiny)[rows]
+        return counts
+
+    def scores(self, queries):
+        """Dense (queries x documents) BM25 scores."""
+        counts = sp.csr_matrix(self.vectorizer.transform(queries), dtype=np.float32)
+        return (self.weigh(counts) @ self.matrix).toarray()
+
+    def __call__(self, q, k=None, batch_size=64, min_score=0, **kwargs):
+        queries = [q] if isinstance(q, str) else list(q)
+        k = min(k or len(self.ids), len(self.ids))
+        batch_size = max(1, min(batch_size, MAX_DENSE_SCORES // max(len(self.ids), 1)))
+        rankings = []
+        for start in range(0, len(queries), batch_size):
+            scores = self.scores(queries[start:start + batch_size])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k else np.zeros((len(scores), 0), dtype=int)
+            for row, columns in zip(scores, top):
+                columns = columns[np.argsort(-row[columns], kind="stable")]
+                rankings.append([{self.key: self.ids[column], "similarity": float(row[column])}
+                                 for column in columns if row[column] > 0 and row[column] >= min_score])
+        logging.debug(f"BM25 ranked {len(queries)} queries against {len(self.ids)} documents")
+        return rankings[0] if isinstance(q, str) else rankings
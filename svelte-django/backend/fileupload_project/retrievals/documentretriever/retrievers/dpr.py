@@ -1,38 +1,32 @@
 #  documentretriever/retrievers/dpr.py
 
 from cherche import retrieve
-from sentence_transformers import SentenceTransformer
 import faiss
-import torch
-from tqdm import tqdm
 import logging
+from .index_factory import create_index
+from .embeddings import EmbeddingService, DPR_CONTEXT_MODEL, DPR_QUESTION_MODEL
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class DPRRetriever:
-    def __init__(self, documents, document_model="facebook-dpr-ctx_encoder-single-nq-base", 
-                 query_model="facebook-dpr-question_encoder-single-nq-base", 
-                 key="id", on=["text"], batch_size=32):
+    def __init__(self, documents, document_model=DPR_CONTEXT_MODEL, 
+                 query_model=DPR_QUESTION_MODEL, 
+                 key="id", on=["text"], batch_size=32, embedding_service=None, index_type="auto"):
         self.documents = documents
         self.key = key
         self.on = on
         self.batch_size = batch_size
+        self.document_model = document_model
+        self.query_model = query_model
         
-        # Determine device (GPU if available, else CPU)
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Share models and corpus embeddings with the other dense retrievers when a service is given
+        self.embeddings = embedding_service if embedding_service else EmbeddingService(batch_size=batch_size)
+        self.device = self.embeddings.device
         logging.info(f"Using device: {self.device}")
         
-        # Load the document and query encoders
-        self.document_encoder = SentenceTransformer(document_model, device=self.device)
-        self.query_encoder = SentenceTransformer(query_model, device=self.device)
-        
-        # Get the embedding dimension from the document encoder
-        embedding_dim = self.document_encoder.get_sentence_embedding_dimension()
-        
-        # Create a Faiss index for storing document embeddings
-        self.index = faiss.IndexFlatL2(embedding_dim)
-        if self.device == "cuda":
-            self.index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, self.index)
+        # Create a Faiss index suited to the corpus size (flat, HNSW or IVF), trained on the corpus embeddings
+        embeddings = self.embeddings.corpus_embeddings(self.document_texts(documents), self.document_model)
+        self.index = create_index(embeddings, index_type, normalize=True, use_gpu=(self.device == "cuda"))
         
         # Initialize the retriever with the encoders and index
         self.retriever = retrieve.DPR(
@@ -48,28 +42,26 @@ class DPRRetriever:
         self.add_documents(documents)
     
     def encode_documents(self, texts):
-        embeddings = []
-        for i in range(0, len(texts), self.batch_size):
-            batch = texts[i:i+self.batch_size]
-            with torch.no_grad():
-                batch_embeddings = self.document_encoder.encode(batch, convert_to_tensor=True, device=self.device)
-                embeddings.append(batch_embeddings.cpu())
-        return torch.cat(embeddings).numpy()
+        return self.embeddings.encode(texts, self.document_model)
 
     def encode_queries(self, texts):
-        with torch.no_grad():
-            return self.query_encoder.encode(texts, convert_to_tensor=True, device=self.device).cpu().numpy()
+        return self.embeddings.encode(texts, self.query_model, use_cache=False)
 
-    def add_documents(self, documents):
+    def document_texts(self, documents):
         try:
-            texts = [doc[self.on[0]] for doc in documents]
+            return [doc[self.on[0]] for doc in documents]
         except KeyError as e:
             logging.error(f"KeyError: {e}. The specified field '{self.on[0]}' is not present in all documents.")
             logging.error(f"Document structure: {documents[0].keys()}")
             logging.error("Please ensure that all documents contain the specified field.")
             raise
-        embeddings = self.encode_documents(texts)
-        self.retriever = self.retriever.add(documents=documents, embeddings_documents=embeddings)
+
+    def add_documents(self, documents):
+        texts = self.document_texts(documents)
+        embeddings = self.embeddings.corpus_embeddings(texts, self.document_model)
+        # cherche's add() would run the encoder again, so feed the precomputed embeddings to its index directly
+        self.retriever.index.add(documents=documents, embeddings=embeddings)
+        self.retriever.k = len(self.retriever.index)
 
     def retrieve(self, query, k=10):
         if isinstance(query, str):
@@ -0,0 +1,157 @@
+#  documentretriever/retrievers/embedding_cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+import unicodedata
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "documentretriever", "embeddings")
+DEFAULT_MAX_SIZE_MB = 4096
+CACHE_DIR_ENV = "DOCUMENTRETRIEVER_EMBEDDING_CACHE"
+MAX_SIZE_ENV = "DOCUMENTRETRIEVER_EMBEDDING_CACHE_MB"
+
+def text_hash(text):
+    """Hash of the text after Unicode (NFC) and whitespace normalization."""
+    normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent cache of text embeddings shared by every project and every run.
+
+    Embeddings are appended in .npy shards (one shard per batch of new texts) that are read
+    back memory-mapped, and an SQLite index maps (model name, normalized text hash) to a
+    shard and row. When the shards outgrow `max_size_mb`, the least recently used shards
+    are deleted together with their index entries.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = cache_dir
+        self.shard_dir = os.path.join(cache_dir, "shards")
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._shards = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=60, check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS shards (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "model TEXT, rows INTEGER, bytes INTEGER, last_used REAL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS entries (model TEXT, hash TEXT, shard INTEGER, row INTEGER, "
+                             "PRIMARY KEY (model, hash))")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_shard ON entries (shard)")
+        logging.info(f"Using embedding cache: {self.cache_dir}")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds the cache configured by DOCUMENTRETRIEVER_EMBEDDING_CACHE (a directory, or "off")
+        and DOCUMENTRETRIEVER_EMBEDDING_CACHE_MB. Returns None when the cache is disabled.
+        """
+        cache_dir = os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+        if cache_dir.lower() in ("", "off", "none", "0"):
+            return None
+        max_size_mb = float(os.environ.get(MAX_SIZE_ENV, DEFAULT_MAX_SIZE_MB))
+        try:
+            return cls(cache_dir, max_size_mb)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Embedding cache disabled, cannot open {cache_dir}: {e}")
+            return None
+
+    def _shard_path(self, shard_id):
+        return os.path.join(self.shard_dir, f"{shard_id:08d}.npy")
+
+    def _load_shard(self, shard_id):
+        if shard_id not in self._shards:
+            self._shards[shard_id] = np.load(self._shard_path(shard_id), mmap_mode='r')
+        return self._shards[shard_id]
+
+    def get(self, model_name, hashes):
+        """Returns {position in hashes: embedding} for every hash that is cached for model_name."""
+        found = {}
+        if not hashes:
+            return found
+        positions = {}
+        for position, h in enumerate(hashes):
+            positions.setdefault(h, []).append(position)
+
+        with self._lock:
+            unique_hashes = list(positions)
+            rows = []
+            # Stay below SQLite's limit on the number of query parameters
+            for start in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[start:start + 500]
+                rows.extend(self._db.execute(
+                    f"SELECT hash, shard, row FROM entries WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                    [model_name] + chunk).fetchall())
+
+            used_shards = set()
+            for h, shard_id, row in rows:
+                try:
+                    embedding = np.array(self._load_shard(shard_id)[row])
+                except (OSError, ValueError, IndexError) as e:
+                    # The shard was evicted by another process or is damaged; recompute the embedding
+                    logging.warning(f"Ignoring unreadable embedding cache shard {shard_id}: {e}")
+                    continue
+                used_shards.add(shard_id)
+                for position in positions[h]:
+                    found[position] = embedding
+
+            if used_shards:
+                now = time.time()
+                with self._db:
+                    self._db.executemany("UPDATE shards SET last_used = ? WHERE id = ?", [(now, s) for s in used_shards])
+
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put(self, model_name, hashes, embeddings):
+        """Stores the embeddings of texts that were not cached yet as a new shard."""
+        if not len(hashes):
+            return
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._lock:
+            with self._db:
+                cursor = self._db.execute("INSERT INTO shards (model, rows, bytes, last_used) VALUES (?, ?, ?, ?)",
+                                          (model_name, len(hashes), embeddings.nbytes, time.time()))
+                shard_id = cursor.lastrowid
+                # Write the shard atomically before its entries become visible to other processes
+                fd, temp_path = tempfile.mkstemp(dir=self.shard_dir, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        np.save(f, embeddings)
+                    os.replace(temp_path, self._shard_path(shard_id))
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+                self._db.executemany("INSERT OR IGNORE INTO entries (model, hash, shard, row) VALUES (?, ?, ?, ?)",
+                                     [(model_name, h, shard_id, row) for row, h in enumerate(hashes)])
+            self._evict(keep=shard_id)
+
+    def _evict(self, keep):
+        total_bytes = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM shards").fetchone()[0]
+        if total_bytes <= self.max_size_bytes:
+            return
+        evicted = 0
+        for shard_id, size in self._db.execute(
+                "SELECT id, bytes FROM shards WHERE id != ? ORDER BY last_used", (keep,)).fetchall():
+            if total_bytes <= self.max_size_bytes:
+                break
+            with self._db:
+                self._db.execute("DELETE FROM entries WHERE shard = ?", (shard_id,))
+                self._db.execute("DELETE FROM shards WHERE id = ?", (shard_id,))
+            self._shards.pop(shard_id, None)
+            try:
+                os.remove(self._shard_path(shard_id))
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            evicted += 1
+        logging.info(f"Evicted {evicted} embedding cache shard(s), {total_bytes / (1024 * 1024):.1f} MB remain")
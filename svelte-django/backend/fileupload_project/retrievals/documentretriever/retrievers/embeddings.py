@@ -0,0 +1,120 @@
+#  documentretriever/retrievers/embeddings.py
+
+import hashlib
+import logging
+import numpy as np
+from tqdm import tqdm
+from .embedding_cache import EmbeddingCache, text_hash
+
+DPR_CONTEXT_MODEL = "facebook-dpr-ctx_encoder-single-nq-base"
+DPR_QUESTION_MODEL = "facebook-dpr-question_encoder-single-nq-base"
+MPNET_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+def corpus_fingerprint(texts):
+    sha1 = hashlib.sha1()
+    for text in texts:
+        sha1.update(text.encode('utf-8'))
+        sha1.update(b'\0')
+    return sha1.hexdigest()
+
+class EmbeddingService:
+    """
+    Loads each SentenceTransformer model once and embeds each corpus once per model.
+
+    Models are shared process-wide, and corpus embeddings are memoized per (model, corpus),
+    so the unified index and every dense retriever built from the same documents reuse a
+    single float32 matrix instead of running the encoder again. Texts embedded in earlier
+    runs are read from the persistent EmbeddingCache; pass cache=False to disable it.
+    """
+
+    _models = {}
+    _default_cache = None
+
+    def __init__(self, device=None, batch_size=32, cache=None):
+        self._device = device
+        self.batch_size = batch_size
+        self.cache = self.default_cache() if cache is None else (cache or None)
+        self._corpus_embeddings = {}
+
+    @classmethod
+    def default_cache(cls):
+        """The process-wide cache configured through the environment (see EmbeddingCache.from_env)."""
+        if cls._default_cache is None:
+            cls._default_cache = EmbeddingCache.from_env() or False
+        return cls._default_cache or None
+
+    @property
+    def device(self):
+        # torch is only imported once a dense method actually needs it
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    def model(self, model_name):
+        key = (model_name, self.device)
+        if key not in EmbeddingService._models:
+            from sentence_transformers import SentenceTransformer
+            logging.info(f"Loading embedding model {model_name} on {self.device}")
+            EmbeddingService._models[key] = SentenceTransformer(model_name, device=self.device)
+        return EmbeddingService._models[key]
+
+    def dimension(self, model_name):
+        return self.model(model_name).get_sentence_embedding_dimension()
+
+    def encode(self, texts, model_name, show_progress=False, use_cache=True):
+        """
+        Encodes texts in batches and returns a float32 numpy matrix. With use_cache, only the
+        texts missing from the embedding cache are run through the model.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        if not (use_cache and self.cache and texts):
+            return self._encode(texts, model_name, show_progress)
+
+        hashes = [text_hash(text) for text in texts]
+        cached = self.cache.get(model_name, hashes)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if cached:
+            logging.info(f"Embedding cache: {len(cached)} of {len(texts)} texts reused for {model_name}")
+        if not missing:
+            return np.vstack([cached[i] for i in range(len(texts))])
+
+        # Encode each distinct missing text once and store it as a new shard
+        first_position = {}
+        for i in missing:
+            first_position.setdefault(hashes[i], i)
+        new_positions = list(first_position.values())
+        new_embeddings = self._encode([texts[i] for i in new_positions], model_name, show_progress)
+        self.cache.put(model_name, [hashes[i] for i in new_positions], new_embeddings)
+
+        embeddings = np.empty((len(texts), new_embeddings.shape[1]), dtype=np.float32)
+        for i, embedding in cached.items():
+            embeddings[i] = embedding
+        new_rows = {h: row for row, h in enumerate(first_position)}
+        for i in missing:
+            embeddings[i] = new_embeddings[new_rows[hashes[i]]]
+        return embeddings
+
+    def _encode(self, texts, model_name, show_progress=False):
+        import torch
+        model = self.model(model_name)
+        batches = range(0, len(texts), self.batch_size)
+        embeddings = []
+        for i in tqdm(batches, desc="Batches") if show_progress else batches:
+            with torch.no_grad():
+                embeddings.append(model.encode(texts[i:i + self.batch_size], convert_to_numpy=True,
+                                               batch_size=self.batch_size, device=self.device))
+        if not embeddings:
+            return np.zeros((0, self.dimension(model_name)), dtype=np.float32)
+        return np.vstack(embeddings).astype(np.float32, copy=False)
+
+    def corpus_embeddings(self, texts, model_name):
+        """Returns the embeddings of a whole corpus, computing them only on the first request."""
+        key = (model_name, corpus_fingerprint(texts))
+        if key not in self._corpus_embeddings:
+            logging.info(f"Embedding {len(texts)} documents with {model_name}")
+            self._corpus_embeddings[key] = self.encode(texts, model_name, show_progress=True)
+        else:
+            logging.info(f"Reusing {model_name} embeddings of {len(texts)} documents")
+        return self._corpus_embeddings[key]
@@ -0,0 +1,81 @@
+#  documentretriever/retrievers/flash.py
+
+import logging
+import numpy as np
+from scipy import sparse
+from flashtext import KeywordProcessor
+from .analysis import TOKEN_PATTERN
+
+# Largest (queries x documents) block of dense scores, in floats, ranked at once
+MAX_DENSE_SCORES = 2 ** 24
+
+class FlashRetriever:
+    """
+    Keyword matching with a flashtext trie built from the vocabulary of the corpus. Each query is
+    scanned once by the trie, which extracts the corpus terms it contains, and documents are scored
+    by the IDF-weighted share of those keywords they contain: 100 when a document contains every
+    keyword of the query, 0 when it contains none. Documents with a score of 0, or below
+    min_score, are not returned.
+
+    The keywords are the lowercased words of the corpus. With analyzed documents (see analysis.py)
+    they are the analyzed terms, and the analyzed queries match them term for term.
+    """
+
+    def __init__(self, key, on, documents):
+        self.key = key
+        self.on = on if isinstance(on, list) else [on]
+        self.ids = [doc[key] for doc in documents]
+
+        words = [TOKEN_PATTERN.findall(" ".join(str(doc.get(field, "")) for field in self.on).lower())
+                 for doc in documents]
+        self.terms = {}
+        columns = [[self.terms.setdefault(word, len(self.terms)) for word in doc_words] for doc_words in words]
+        self.processor = KeywordProcessor()
+        # flashtext only treats ASCII letters and digits as word characters by default
+        self.processor.non_word_boundaries = set("".join(self.terms))
+        self.processor.add_keywords_from_dict({term: [term] for term in self.terms})
+
+        # Binary (documents x terms) matrix of the terms each document contains
+        indptr = np.cumsum([0] + [len(doc_columns) for doc_columns in columns])
+        indices = np.fromiter((column for doc_columns in columns for column in doc_columns), dtype=np.int64, count=indptr[-1])
+        self.matrix = sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                                        shape=(len(self.ids), len(self.terms)))
+        self.matrix.sum_duplicates()
+        self.matrix.data[:] = 1
+        document_frequency = np.bincount(self.matrix.indices, minlength=len(self.terms))
+        self.idf = np.log(1 + len(self.ids) / np.maximum(document_frequency, 1)).astype(np.float32)
+        self.matrix = self.matrix.T.tocsr()
+
+    def __repr__(self):
+        return (f"Flash retriever\n\tkey      : {self.key}\n\ton       : {', '.join(self.on)}\n"
+                f"\tdocuments: {len(self.ids)}\n\tkeywords : {len(self.terms)}")
+
+    def keywords(self, query):
+        """Indices of the distinct corpus terms found in the query."""
+        return sorted({self.terms[term] for term in self.processor.extract_keywords(query)})
+
+    def scores(self, queries):
+        """Dense (queries x documents) scores from 0 to 100."""
+        keywords = [self.keywords(query) for query in queries]
+        indptr = np.cumsum([0] + [len(query_keywords) for query_keywords in keywords])
+        indices = np.fromiter((term for query_keywords in keywords for term in query_keywords), dtype=np.int64, count=indptr[-1])
+        weights = sparse.csr_matrix((self.idf[indices], indices, indptr), shape=(len(queries), len(self.terms)))
+        totals = np.asarray(weights.sum(axis=1)).ravel()
+        # Queries without any corpus keyword score 0 everywhere
+        scale = np.divide(100, totals, out=np.zeros_like(totals), where=totals > 0)
+        return np.minimum((weights @ self.matrix).toarray() * scale[:, None], 100)
+
+    def __call__(self, q, k=None, batch_size=64, min_score=0, **kwargs):
+        queries = [q] if isinstance(q, str) else list(q)
+        k = min(k or len(self.ids), len(self.ids))
+        batch_size = max(1, min(batch_size, MAX_DENSE_SCORES // max(len(self.ids), 1)))
+        rankings = []
+        for start in range(0, len(queries), batch_size):
+            scores = self.scores(queries[start:start + batch_size])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k else np.zeros((len(scores), 0), dtype=int)
+            for row, columns in zip(scores, top):
+                columns = columns[np.argsort(-row[columns], kind="stable")]
+                rankings.append([{self.key: self.ids[column], "similarity": float(row[column])}
+                                 for column in columns if row[column] > 0 and row[column] >= min_score])
+        logging.debug(f"Flash matched {len(queries)} queries against {len(self.terms)} keywords")
+        return rankings[0] if isinstance(q, str) else rankings
@@ -0,0 +1,100 @@
+#  documentretriever/retrievers/fuzzy.py
+
+import logging
+import numpy as np
+from scipy import sparse
+from rapidfuzz import fuzz, process, utils
+
+NGRAM_BUCKETS = 2 ** 20
+
+def char_ngrams(texts, n=3, buckets=NGRAM_BUCKETS):
+    """Binary (texts x buckets) CSR matrix of the hashed character n-grams of each text."""
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    hashes = np.zeros(max(len(codes) - n + 1, 0), dtype=np.int64)
+    for i in range(n):
+        hashes = hashes * 1000003 + codes[i:len(hashes) + i]
+    hashes %= buckets
+
+    # Drop the n-grams that straddle two texts, then the repeated n-grams within a text
+    rows = np.repeat(np.arange(len(texts)), lengths)[:len(hashes)]
+    valid = np.arange(len(hashes)) + n <= np.cumsum(lengths)[rows]
+    keys = np.sort(rows[valid] * buckets + hashes[valid])
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+    indptr = np.searchsorted(keys // buckets, np.arange(len(texts) + 1))
+    return sparse.csr_matrix((np.ones(len(keys), dtype=np.float32), keys % buckets, indptr),
+                             shape=(len(texts), buckets))
+
+class FuzzRetriever:
+    """
+    Fuzzy matching of a whole batch of queries against the corpus with rapidfuzz's process.cdist,
+    which scores on `workers` threads (-1: every core; a call can pass its own budget). Queries and documents get rapidfuzz's default
+    processing (lowercase, punctuation stripped) and scores range from 0 to 100, as with cherche's Fuzz.
+
+    A character n-gram prefilter skips hopeless pairs: a document is only scored against a query when
+    at least min_overlap of the n-grams of the shorter of the two also occur in the other. The
+    max(k, min_candidates) documents with the largest overlap are always scored, so every query
+    still gets k results. Set min_overlap to 0 to score every pair. Documents scoring below
+    min_score are not returned.
+    """
+
+    def __init__(self, key, on, documents, scorer="partial_ratio", ngram=3, min_overlap=0.3, min_candidates=0, workers=-1):
+        self.key = key
+        self.on = on if isinstance(on, list) else [on]
+        self.scorer = scorer
+        self.ngram = ngram
+        self.min_overlap = min_overlap
+        self.min_candidates = min_candidates
+        self.workers = workers
+        self.ids = [doc[key] for doc in documents]
+        self.texts = [utils.default_process(" ".join(str(doc.get(field, "")) for field in self.on)) for doc in documents]
+        self.ngrams = char_ngrams(self.texts, ngram)
+        self.ngram_counts = np.diff(self.ngrams.indptr)
+
+    def __repr__(self):
+        return f"Fuzz retriever\n\tkey      : {self.key}\n\ton       : {', '.join(self.on)}\n\tdocuments: {len(self.ids)}"
+
+    def candidates(self, queries, k):
+        """Boolean (queries x documents) mask of the pairs worth scoring."""
+        query_ngrams = char_ngrams(queries, self.ngram)
+        shared = (query_ngrams @ self.ngrams.T).toarray()
+        smaller = np.minimum(np.diff(query_ngrams.indptr)[:, None], self.ngram_counts[None, :])
+        overlap = shared / np.maximum(smaller, 1)
+
+        mask = overlap >= self.min_overlap
+        # The best overlapping documents are scored even below the threshold, so no query runs short of results
+        keep = min(len(self.ids), max(k, self.min_candidates))
+        best = np.argpartition(-overlap, keep - 1, axis=1)[:, :keep]
+        np.put_along_axis(mask, best, True, axis=1)
+        return mask
+
+    def scores(self, queries, k, workers=None):
+        """(queries x documents) scores from 0 to 100; the pairs rejected by the prefilter score 0."""
+        scorer = getattr(fuzz, self.scorer)
+        workers = workers or self.workers
+        if not self.min_overlap:
+            return process.cdist(queries, self.texts, scorer=scorer, dtype=np.float32, workers=workers)
+
+        mask = self.candidates(queries, k)
+        # Only the surviving (query, document) pairs are scored, in one multi-core call
+        query_rows, columns = np.nonzero(mask)
+        scores = np.zeros(mask.shape, dtype=np.float32)
+        scores[query_rows, columns] = process.cpdist([queries[row] for row in query_rows],
+                                                     [self.texts[column] for column in columns],
+                                                     scorer=scorer, dtype=np.float32, workers=workers)
+        logging.debug(f"Fuzz scored {len(columns)} of {mask.size} query-document pairs")
+        return scores
+
+    def __call__(self, q, k=None, batch_size=64, min_score=0, workers=None, **kwargs):
+        queries = [q] if isinstance(q, str) else list(q)
+        k = min(k or len(self.ids), len(self.ids))
+        rankings = []
+        for start in range(0, len(queries), batch_size):
+            batch = [utils.default_process(query) for query in queries[start:start + batch_size]]
+            scores = self.scores(batch, k, workers)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, columns in zip(scores, top):
+                columns = columns[np.argsort(-row[columns], kind="stable")]
+                rankings.append([{self.key: self.ids[column], "similarity": float(row[column])}
+                                 for column in columns if row[column] >= min_score])
+        return rankings[0] if isinstance(q, str) else rankings
@@ -1,17 +1,34 @@
 import logging
 from cherche import retrieve
-from sentence_transformers import SentenceTransformer
-import faiss
-from rapidfuzz import fuzz
 from lenlp import sparse
+from lunr.builder import Builder
+from .analysis import ANALYZED_METHODS
+from .bm25 import BM25Retriever
+from .fuzzy import FuzzRetriever
+from .flash import FlashRetriever
+from .embeddings import EmbeddingService, MPNET_MODEL
+from .index_factory import create_index
+
+# Retrievers that take min_score themselves and never build the results below it
+NATIVE_RETRIEVERS = (BM25Retriever, FlashRetriever, FuzzRetriever)
+
+def drop_below(results, min_score):
+    """Removes the documents scoring below min_score from one ranking or a list of rankings."""
+    if results and isinstance(results[0], list):
+        return [[document for document in ranking if document["similarity"] >= min_score] for ranking in results]
+    return [document for document in results if document["similarity"] >= min_score]
 
 class DocumentRetriever:
-    def __init__(self, method, documents, on, key="id", use_gpu=False, **kwargs):
+    def __init__(self, method, documents, on, key="id", use_gpu=False, embedding_service=None, retriever=None, analyzer=None, **kwargs):
         self.method = method.lower()
         self.documents = documents
         self.key = key
         self.on = on
         self.use_gpu = use_gpu
+        self.embedding_service = embedding_service
+        # With an analyzer, documents hold already analyzed text and queries are analyzed the same way
+        self.analyzer = analyzer if self.method in ANALYZED_METHODS else None
+        self.query_embeddings = None
         self.kwargs = kwargs
         self.retriever = None
         self.encoder_model = None
@@ -21,7 +38,10 @@ class DocumentRetriever:
         logging.debug(f"Number of documents: {len(documents)}")
         logging.debug(f"Sample document: {documents[0] if documents else 'No documents'}")
 
-        if self.method == "bm25":
+        if retriever is not None:
+            # A prebuilt cherche retriever, e.g. loaded from a SparseIndexStore
+            self.retriever = retriever
+        elif self.method == "bm25":
             self.retriever = self._init_bm25()
         elif self.method == "tfidf":
             self.retriever = self._init_tfidf()
@@ -44,7 +64,7 @@ class DocumentRetriever:
 
     def _init_bm25(self):
         logging.info("Initializing BM25 retriever")
-        valid_params = ['k']
+        valid_params = ['k1', 'b']
         filtered_kwargs = self._filter_kwargs(valid_params)
         try:
             logging.debug(f"Number of documents: {len(self.documents)}")
@@ -52,7 +72,7 @@ class DocumentRetriever:
             logging.debug(f"Fields used for BM25: {self.on}")
             logging.debug(f"Sample document content for BM25 fields: {' '.join(str(self.documents[0].get(field, '')) for field in self.on)[:100]}...")
             
-            retriever = retrieve.BM25(key=self.key, on=self.on, documents=self.documents, **filtered_kwargs)
+            retriever = BM25Retriever(key=self.key, on=self.on, documents=self.documents, **filtered_kwargs)
             logging.info("BM25 retriever initialized successfully")
             return retriever
         except Exception as e:
@@ -75,8 +95,7 @@ class DocumentRetriever:
     def _init_flash(self):
         logging.info("Initializing Flash retriever")
         try:
-            retriever = retrieve.Flash(key=self.key, on=self.on)
-            retriever.add(self.documents)
+            retriever = FlashRetriever(key=self.key, on=self.on, documents=self.documents)
             logging.info("Flash retriever initialized successfully")
             return retriever
         except Exception as e:
@@ -86,7 +105,20 @@ class DocumentRetriever:
     def _init_lunr(self):
         logging.info("Initializing Lunr retriever")
         try:
-            retriever = retrieve.Lunr(key=self.key, on=self.on, documents=self.documents)
+            if self.analyzer is None:
+                retriever = retrieve.Lunr(key=self.key, on=self.on, documents=self.documents)
+            else:
+                # lunr's own trimmer, stopword filter and stemmer would process the analyzed terms a second
+                # time, so the index is rebuilt without them (cherche cannot build over an empty corpus)
+                retriever = retrieve.Lunr(key=self.key, on=self.on, documents=self.documents[:1])
+                retriever.documents = {str(doc[self.key]): {self.key: doc[self.key]} for doc in self.documents}
+                builder = Builder()
+                builder.ref(self.key)
+                for field in self.on:
+                    builder.field(field)
+                for doc in self.documents:
+                    builder.add({field: doc.get(field, "") for field in [self.key] + self.on})
+                retriever.idx = builder.build()
             logging.info("Lunr retriever initialized successfully")
             return retriever
         except Exception as e:
@@ -95,12 +127,10 @@ class DocumentRetriever:
 
     def _init_fuzz(self):
         logging.info("Initializing Fuzz retriever")
-        valid_params = ['fuzzer']
+        valid_params = ['scorer', 'min_overlap', 'workers']
         filtered_kwargs = self._filter_kwargs(valid_params)
         try:
-            fuzzer = filtered_kwargs.get("fuzzer", fuzz.partial_ratio)
-            retriever = retrieve.Fuzz(key=self.key, on=self.on, fuzzer=fuzzer)
-            retriever.add(self.documents)
+            retriever = FuzzRetriever(key=self.key, on=self.on, documents=self.documents, **filtered_kwargs)
             logging.info("Fuzz retriever initialized successfully")
             return retriever
         except Exception as e:
@@ -109,25 +139,20 @@ class DocumentRetriever:
 
     def _init_embedding(self):
         logging.info("Initializing Embedding retriever")
-        valid_params = ['model_name']
+        valid_params = ['model_name', 'index_type']
         filtered_kwargs = self._filter_kwargs(valid_params)
         try:
-            model_name = filtered_kwargs.get("model_name", "sentence-transformers/all-mpnet-base-v2")
-            self.encoder_model = SentenceTransformer(model_name, device="cuda" if self.use_gpu else "cpu")
-            encoder = self.encoder_model.encode
+            model_name = filtered_kwargs.get("model_name", MPNET_MODEL)
+            if self.embedding_service is None:
+                self.embedding_service = EmbeddingService(device="cuda" if self.use_gpu else "cpu")
+            self.encoder_model = self.embedding_service.model(model_name)
+            self.model_name = model_name
 
-            def wrapped_encoder(texts):
-                if isinstance(texts, str):
-                    texts = [texts]
-                return encoder(texts)
-
-            d = wrapped_encoder(["This is a sample document."])[0].shape[0]
-            index = faiss.IndexFlatL2(d)
-            if self.use_gpu:
-                index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, index)
+            embeddings_documents = self.embedding_service.corpus_embeddings([doc["text"] for doc in self.documents], model_name)
+            index = create_index(embeddings_documents, filtered_kwargs.get("index_type", "auto"),
+                                 normalize=True, use_gpu=self.use_gpu)
 
             retriever = retrieve.Embedding(key=self.key, index=index)
-            embeddings_documents = wrapped_encoder([doc["text"] for doc in self.documents])
             retriever.add(documents=self.documents, embeddings_documents=embeddings_documents)
             logging.info("Embedding retriever initialized successfully")
             return retriever
@@ -136,7 +161,11 @@ class DocumentRetriever:
             raise
 
 
-    def retrieve(self, query, k=10, batch_size=64):
+    def retrieve(self, query, k=10, batch_size=64, min_score=0, threads=None):
+        """
+        Returns the top k documents of each query, leaving out those whose similarity is below min_score.
+        threads is the number of cores this call may use (None: the retriever's own setting).
+        """
         logging.info(f"Retrieving with method: {self.method}")
         
         # Extract the 'Clause' value if query is a dictionary
@@ -145,22 +174,30 @@ class DocumentRetriever:
         
         if isinstance(query, str):
             query = [query]
+        if self.analyzer is not None:
+            query = self.analyzer.analyze(query)
     
         logging.info(f"Processed query type: {type(query)}")
         logging.debug(f"Processed query content: {query[0][:100]}...")  # Log the first 100 characters of the first query
     
         try:
             if self.method in ["encoder", "embedding"]:
-                query_embeddings = self.encoder_model.encode(query)
-                results = self.retriever(q=query_embeddings, k=k)
+                query_embeddings = None
+                if self.query_embeddings is not None:
+                    query_embeddings = self.query_embeddings.lookup(query, self.model_name)
+                if query_embeddings is None:
+                    query_embeddings = self.embedding_service.encode(query, self.model_name, use_cache=False)
+                results = self.retriever(q=query_embeddings, k=k, batch_size=batch_size)
             elif self.method == "dpr":
                 query_embeddings = self.query_encoder(query)
                 results = self.retriever(q=query_embeddings, k=k)
-            elif self.method == "flash":
-                results = self.retriever(query)
+            elif isinstance(self.retriever, NATIVE_RETRIEVERS):
+                results = self.retriever(query, k=k, batch_size=batch_size, min_score=min_score, workers=threads)
             else:
                 logging.debug(f"Calling {self.method} retriever with query type: {type(query)}")
-                results = self.retriever(query, k=k)
+                results = self.retriever(query, k=k, batch_size=batch_size)
+            if min_score and not isinstance(self.retriever, NATIVE_RETRIEVERS):
+                results = drop_below(results, min_score)
             
             logging.debug(f"Retrieved {len(results)} results")
             return results
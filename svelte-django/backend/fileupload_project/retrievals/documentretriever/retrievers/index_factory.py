@@ -0,0 +1,112 @@
+#  documentretriever/retrievers/index_factory.py
+
+import math
+import logging
+import numpy as np
+
+INDEX_TYPES = ('auto', 'flat', 'hnsw', 'ivf-flat', 'ivf-pq')
+
+# Corpus sizes (number of vectors) at which 'auto' switches to the next index type
+HNSW_MIN_VECTORS = 20000
+IVF_FLAT_MIN_VECTORS = 200000
+IVF_PQ_MIN_VECTORS = 1000000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+MAX_TRAINING_VECTORS = 100000
+
+def choose_index_type(num_vectors):
+    """Exact search for small corpora, graph or inverted-file indexes as projects grow."""
+    if num_vectors >= IVF_PQ_MIN_VECTORS:
+        return 'ivf-pq'
+    if num_vectors >= IVF_FLAT_MIN_VECTORS:
+        return 'ivf-flat'
+    if num_vectors >= HNSW_MIN_VECTORS:
+        return 'hnsw'
+    return 'flat'
+
+def ivf_list_count(num_vectors):
+    # About 4 * sqrt(n) lists, with at least 39 training vectors per list as FAISS recommends
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+def pq_subquantizers(dimension):
+    for m in (dimension // 8, 96, 64, 48, 32, 24, 16, 8, 4, 2, 1):
+        if m and dimension % m == 0:
+            return m
+
+def training_sample(embeddings, normalize=False, seed=0):
+    sample = embeddings
+    if len(embeddings) > MAX_TRAINING_VECTORS:
+        rows = np.random.RandomState(seed).choice(len(embeddings), MAX_TRAINING_VECTORS, replace=False)
+        sample = embeddings[np.sort(rows)]
+    sample = np.ascontiguousarray(sample, dtype=np.float32)
+    if normalize:
+        sample = sample / np.linalg.norm(sample, axis=-1)[:, None]
+    return sample
+
+def create_index(embeddings, index_type='auto', normalize=False, use_gpu=False):
+    """
+    Returns an empty L2 index suited to embeddings, already trained on a sample of them when the
+    index type needs training. Set normalize when the caller adds unit-length vectors (as cherche
+    does), so that training sees the same distribution. IVF types fall back to a flat index when
+    the corpus is too small to train them.
+    """
+    import faiss
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+    num_vectors, dimension = embeddings.shape
+    if index_type == 'auto':
+        index_type = choose_index_type(num_vectors)
+
+    if index_type == 'ivf-pq' and num_vectors < 39 * 256:
+        # PQ codebooks have 256 centroids and need enough vectors to train them
+        logging.warning(f"Only {num_vectors} vectors, too few to train ivf-pq; using ivf-flat")
+        index_type = 'ivf-flat'
+    if index_type == 'ivf-flat' and num_vectors < 39 * 4:
+        logging.warning(f"Only {num_vectors} vectors, too few to train {index_type}; using a flat index")
+        index_type = 'flat'
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(dimension)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        nlist = ivf_list_count(num_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == 'ivf-flat':
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_subquantizers(dimension), 8)
+        index.nprobe = min(IVF_NPROBE, nlist)
+        sample = training_sample(embeddings, normalize)
+        logging.info(f"Training {index_type} index ({nlist} lists) on {len(sample)} vectors")
+        index.train(sample)
+    logging.info(f"Using {index_type} index for {num_vectors} vectors of dimension {dimension}")
+
+    if use_gpu:
+        if index_type == 'hnsw':
+            logging.warning("HNSW indexes are not supported on GPU; keeping it on the CPU")
+        else:
+            index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, index)
+    return index
+
+def read_index(file_path, mmap=False):
+    """
+    Reads an index from disk. With mmap, the vectors (flat codes or inverted lists) stay in the file
+    and are paged in on demand, so the load takes milliseconds and concurrent processes share the
+    page cache instead of each holding a private copy. Falls back to a normal read when the index
+    type or FAISS build does not support memory mapping.
+    """
+    import faiss
+    if mmap:
+        # IO_FLAG_MMAP_IFC also maps flat and HNSW storage; older FAISS builds only map IVF lists
+        flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+        try:
+            return faiss.read_index(str(file_path), flag)
+        except RuntimeError as e:
+            logging.warning(f"Could not memory-map {file_path}, reading it into memory instead: {e}")
+    return faiss.read_index(str(file_path))
@@ -4,6 +4,8 @@ import json
 import logging
 from typing import List, Dict, Any
 
+from ..documents_io import iter_documents
+
 # Import specific retriever implementations
 from .encoder import DocumentRetriever as EncoderDocumentRetriever
 from .dpr import DPRRetriever
@@ -13,10 +15,9 @@ from .golden import DocumentRetriever as GoldenDocumentRetriever
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def load_documents(file_path: str) -> List[Dict[str, Any]]:
-    """Load documents from a JSON file."""
+    """Load documents from a JSON or JSON Lines file."""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return list(iter_documents(file_path))
     except Exception as e:
         logging.error(f"Error loading documents from {file_path}: {e}")
         raise
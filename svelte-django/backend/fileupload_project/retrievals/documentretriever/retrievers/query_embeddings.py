@@ -0,0 +1,89 @@
+#  documentretriever/retrievers/query_embeddings.py
+
+import os
+import re
+import logging
+import tempfile
+import numpy as np
+from .embedding_cache import text_hash
+from .embeddings import corpus_fingerprint
+
+def query_text(query):
+    """Returns the text of a query given either as a string or as a clause record ({"Clause": ...})."""
+    if isinstance(query, dict) and 'Clause' in query:
+        return query['Clause']
+    return query
+
+class QueryEmbeddingStore:
+    """
+    Embeddings of a fixed query library, such as the clause set in pastcod/output_two_columns.json.
+
+    The library is encoded once per model in a single batched pass and saved next to the query
+    file as <name>.<model>.npz together with a fingerprint of the model and clause texts. Later
+    runs, for any project, load the matrix instead of encoding the clauses again; editing the
+    query file changes the fingerprint and triggers a re-encode.
+    """
+
+    def __init__(self, query_file, queries, embedding_service):
+        self.query_file = query_file
+        self.texts = [str(query_text(query)) for query in queries.values()]
+        self.embedding_service = embedding_service
+        self._models = {}
+
+    def path_for(self, model_name):
+        safe_model_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        return f"{os.path.splitext(self.query_file)[0]}.{safe_model_name}.npz"
+
+    def _load_or_encode(self, model_name):
+        fingerprint = corpus_fingerprint([model_name] + self.texts)
+        path = self.path_for(model_name)
+        try:
+            with np.load(path) as stored:
+                if str(stored['fingerprint']) == fingerprint:
+                    logging.info(f"Loaded {len(self.texts)} precomputed query embeddings from {path}")
+                    return stored['embeddings']
+            logging.info(f"Query embeddings in {path} are stale, re-encoding")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable query embeddings {path}: {e}")
+
+        logging.info(f"Encoding {len(self.texts)} queries with {model_name}")
+        embeddings = self.embedding_service.encode(self.texts, model_name, show_progress=True, use_cache=False)
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, embeddings=embeddings, fingerprint=np.array(fingerprint))
+            os.replace(temp_path, path)
+            logging.info(f"Saved query embeddings to {path}")
+        except OSError as e:
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+            # A read-only deployment still benefits from the in-memory copy for this run
+            logging.warning(f"Could not save query embeddings to {path}: {e}")
+        return embeddings
+
+    def embeddings(self, model_name):
+        """Returns (row of each query text hash, embedding matrix) for model_name."""
+        if model_name not in self._models:
+            matrix = self._load_or_encode(model_name)
+            rows = {}
+            for row, text in enumerate(self.texts):
+                rows.setdefault(text_hash(text), row)
+            self._models[model_name] = (rows, matrix)
+        return self._models[model_name]
+
+    def lookup(self, queries, model_name):
+        """
+        Returns the stored embeddings of queries (strings or clause records) as a matrix,
+        or None if any of them is not part of the library.
+        """
+        if isinstance(queries, (str, dict)):
+            queries = [queries]
+        rows, matrix = self.embeddings(model_name)
+        try:
+            indices = [rows[text_hash(str(query_text(query)))] for query in queries]
+        except KeyError:
+            return None
+        return matrix[indices]
@@ -0,0 +1,123 @@
+#  documentretriever/retrievers/sparse_index_store.py
+
+import os
+import copy
+import json
+import time
+import pickle
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from importlib import metadata
+from .embeddings import corpus_fingerprint
+
+SPARSE_INDEX_FORMAT = 5
+PERSISTED_METHODS = ("bm25", "tfidf", "flash", "lunr", "fuzz")
+LIBRARIES = ("cherche", "lenlp", "lunr", "flashtext", "rapidfuzz", "scipy")
+
+def library_versions():
+    versions = {}
+    for library in LIBRARIES:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+def _write_atomic(path, write):
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+class SparseIndexStore:
+    """
+    Serialized BM25, TF-IDF, Flash, Lunr and Fuzz retrievers kept next to the FAISS indexes.
+
+    Each method is pickled to <directory>/v<format>/<method>.pkl (Lunr's index is stored as its
+    own JSON serialization) and listed in manifest.json together with a fingerprint of the corpus,
+    the versions of the retrieval libraries and the signature of the text analysis. A store whose
+    manifest does not match the current documents, libraries or analysis is ignored and
+    overwritten on the next save.
+    """
+
+    def __init__(self, directory, documents, key="id", on=["text"], analysis=None):
+        self.directory = Path(directory) / f"v{SPARSE_INDEX_FORMAT}"
+        self.manifest_path = self.directory / "manifest.json"
+        self.fingerprint = corpus_fingerprint(
+            [f"{doc[key]}\t{' '.join(str(doc.get(field, '')) for field in on)}" for doc in documents])
+        self.document_count = len(documents)
+        self.versions = library_versions()
+        self.analysis = analysis
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def directory_for(index_path):
+        """unified_index.faiss -> unified_index.sparse"""
+        path = Path(index_path)
+        return path.with_name(f"{path.stem}.sparse")
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable sparse index manifest {self.manifest_path}: {e}")
+            return None
+        if (manifest.get("corpus_fingerprint") != self.fingerprint or manifest.get("versions") != self.versions
+                or manifest.get("analysis") != self.analysis):
+            logging.info(f"Sparse indexes in {self.directory} are stale")
+            return None
+        return manifest
+
+    def load(self, method):
+        """Returns the stored cherche retriever for method, or None if it has to be rebuilt."""
+        manifest = self._read_manifest()
+        if not manifest or method not in manifest["methods"]:
+            return None
+        entry = manifest["methods"][method]
+        try:
+            with open(self.directory / entry["file"], 'rb') as f:
+                retriever = pickle.load(f)
+            if "lunr_index" in entry:
+                from lunr.index import Index
+                with open(self.directory / entry["lunr_index"], 'r') as f:
+                    retriever.idx = Index.load(json.load(f))
+        except Exception as e:
+            logging.warning(f"Could not load the stored {method} index, rebuilding it: {e}")
+            return None
+        logging.info(f"Loaded {method} index from {self.directory}")
+        return retriever
+
+    def save(self, method, retriever):
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entry = {"file": f"{method}.pkl", "saved_at": time.time()}
+            if method == "lunr":
+                entry["lunr_index"] = f"{method}.json"
+                serialized = json.dumps(retriever.idx.serialize()).encode('utf-8')
+                _write_atomic(self.directory / entry["lunr_index"], lambda f: f.write(serialized))
+                retriever = copy.copy(retriever)
+                retriever.idx = None
+            _write_atomic(self.directory / entry["file"],
+                          lambda f: pickle.dump(retriever, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+            # The manifest is written last, so it never lists a method whose files are incomplete
+            manifest = self._read_manifest() or {
+                "format": SPARSE_INDEX_FORMAT,
+                "corpus_fingerprint": self.fingerprint,
+                "documents": self.document_count,
+                "versions": self.versions,
+                "analysis": self.analysis,
+                "methods": {},
+            }
+            manifest["methods"][method] = entry
+            _write_atomic(self.manifest_path, lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8')))
+        logging.info(f"Saved {method} index to {self.directory}")
@@ -0,0 +1,22 @@
+#  documentretriever/scores.py
+
+# Factor that puts a method's similarities on the scale of the analyser's --min_threshold. BM25 and
+# TF-IDF (cosine similarities) and embedding (1 / (1 + L2 distance)) score between 0 and 1; fuzz and
+# flash already score from 0 to 100. The other methods are compared as they are, as the analyser always did.
+SCORE_SCALES = {"bm25": 100, "tfidf": 100, "embedding": 100}
+
+# Largest similarity each method can return, in its own units, for the methods whose scores are bounded.
+# dpr and encoder scores are 1 / (1 + L2 distance). lunr is missing on purpose: its scores are sums of
+# BM25 term weights and grow with the number of rare query terms a document matches.
+MAX_SCORES = {"bm25": 1, "tfidf": 1, "embedding": 1, "dpr": 1, "encoder": 1, "fuzz": 100, "flash": 100}
+
+def score_scale(method):
+    return SCORE_SCALES.get(method, 1)
+
+def raw_threshold(method, min_threshold):
+    """The similarity, in the method's own units, that corresponds to min_threshold on the analyser's scale."""
+    return min_threshold / score_scale(method) if min_threshold else 0
+
+def unreachable(method, min_threshold):
+    """True when no result of the method can reach min_threshold, so that running it would be wasted."""
+    return method in MAX_SCORES and raw_threshold(method, min_threshold) > MAX_SCORES[method]
@@ -0,0 +1,103 @@
+#  documentretriever/supervised_pool.py
+
+import time
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from collections import deque
+import psutil
+
+class SupervisedPool:
+    """
+    Runs each task in its own worker process, at most `workers` at a time.
+
+    A worker that runs longer than `timeout` seconds or whose resident memory grows
+    beyond `max_rss_mb` is killed and its task is reported as failed, so a single
+    pathological document cannot stall or take down the rest of the run. Results are
+    yielded in task order as (ok, result) pairs, where result is the error message
+    when ok is False.
+    """
+
+    def __init__(self, workers=1, timeout=None, max_rss_mb=None, poll_interval=0.2):
+        self.workers = max(1, workers)
+        self.timeout = timeout or None
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.poll_interval = poll_interval
+        self.context = multiprocessing.get_context()
+
+    @staticmethod
+    def _run_task(conn, function, args):
+        try:
+            conn.send((True, function(*args)))
+        except BaseException as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+        finally:
+            conn.close()
+
+    def _start(self, function, args):
+        parent_conn, child_conn = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=self._run_task, args=(child_conn, function, args), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn, time.monotonic()
+
+    @staticmethod
+    def _kill(process):
+        process.kill()
+        process.join()
+
+    def _rss(self, process):
+        try:
+            return psutil.Process(process.pid).memory_info().rss
+        except psutil.Error:
+            return 0
+
+    def imap(self, function, tasks):
+        """Applies function(*task) to every task and yields (ok, result) in task order."""
+        pending = deque(enumerate(tasks))
+        running = {}
+        finished = {}
+        next_index = 0
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    index, args = pending.popleft()
+                    running[index] = self._start(function, args)
+
+                ready = wait([conn for _, conn, _ in running.values()], timeout=self.poll_interval)
+                for index, (process, conn, start_time) in list(running.items()):
+                    if conn in ready:
+                        try:
+                            finished[index] = conn.recv()
+                        except EOFError:
+                            process.join()
+                            finished[index] = (False, f"worker exited with code {process.exitcode}")
+                        conn.close()
+                        process.join()
+                        del running[index]
+                        continue
+
+                    elapsed = time.monotonic() - start_time
+                    if self.timeout and elapsed > self.timeout:
+                        self._kill(process)
+                        finished[index] = (False, f"timed out after {self.timeout}s")
+                    elif self.max_rss_bytes and self._rss(process) > self.max_rss_bytes:
+                        self._kill(process)
+                        finished[index] = (False, f"exceeded memory limit of {self.max_rss_bytes // (1024 * 1024)} MB")
+                    elif not process.is_alive() and not conn.poll():
+                        finished[index] = (False, f"worker exited with code {process.exitcode}")
+                    else:
+                        continue
+                    logging.error(f"Task {index} failed: {finished[index][1]}")
+                    conn.close()
+                    del running[index]
+
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            # Do not leave workers behind if the consumer stops early or raises
+            for process, conn, _ in running.values():
+                self._kill(process)
+                conn.close()
@@ -1,21 +1,29 @@
 # unified_retriever.py
 
+import os
+import json
 import logging
-import faiss
-import torch
+import tempfile
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from tqdm import tqdm
 from typing import List, Dict, Any
 from pathlib import Path
 
-# Import the necessary retriever classes
-from .retrievers.dpr import DPRRetriever
-from .retrievers.encoder import DocumentRetriever as EncoderDocumentRetriever
-from .retrievers.golden import DocumentRetriever as GoldenDocumentRetriever
+# torch, faiss, sentence_transformers and cherche are imported by the retrievers that need them,
+# so a run that only uses sparse methods never loads the dense stack (and vice versa)
+from .retrievers.embeddings import EmbeddingService, DPR_CONTEXT_MODEL, DPR_QUESTION_MODEL, MPNET_MODEL
+from .retrievers.query_embeddings import query_text
+from .retrievers.index_factory import create_index, read_index
+from .retrievers.sparse_index_store import SparseIndexStore, PERSISTED_METHODS
+from .retrievers.analysis import Analyzer, ANALYZED_METHODS
+from .scores import raw_threshold, unreachable
+
+SPARSE_METHODS = ["bm25", "tfidf", "flash", "lunr", "fuzz", "embedding"]
+VECTOR_MODELS = {"dpr": DPR_QUESTION_MODEL, "encoder": MPNET_MODEL}
+DOCUMENT_MODELS = {"dpr": DPR_CONTEXT_MODEL, "encoder": MPNET_MODEL}
 
 class UnifiedRetriever:
-    def __init__(self, documents: List[Dict[str, Any]], key: str = "id", on: List[str] = ["text"], batch_size: int = 32, load_existing: bool = False):
+    def __init__(self, documents: List[Dict[str, Any]], key: str = "id", on: List[str] = ["text"], batch_size: int = 32, load_existing: bool = False, embedding_service: EmbeddingService = None, index_type: str = "auto", analyzer: Analyzer = None, methods: List[str] = None):
         if not documents:
             raise ValueError("No documents provided for retrieval")
         
@@ -23,85 +31,146 @@ class UnifiedRetriever:
         self.key = key
         self.on = on
         self.batch_size = batch_size
+        self.index_type = index_type
         
         logging.info(f"Initializing UnifiedRetriever with {len(documents)} documents")
         
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logging.info(f"Using device: {self.device}")
+        # One service for every dense retriever: each model is loaded once and each corpus embedded once per model
+        self.embeddings = embedding_service if embedding_service else EmbeddingService(batch_size=batch_size)
+        self.query_embeddings = None
+        self.sparse_store = None
+        # One analysis for every sparse retriever: the corpus is analyzed once, on first use
+        self.analyzer = analyzer if analyzer else Analyzer()
+        self._analyzed_documents = None
+        self._analysis_lock = threading.Lock()
         
+        self.indexes = {}
+        self._index_file = None
+        self._index_mmap = False
         if not load_existing:
-            self.dpr_encoder = SentenceTransformer('facebook-dpr-ctx_encoder-single-nq-base', device=self.device)
-            self.dpr_query_encoder = SentenceTransformer('facebook-dpr-question_encoder-single-nq-base', device=self.device)
-            self.encoder = SentenceTransformer("sentence-transformers/all-mpnet-base-v2", device=self.device)
-            
-            self.create_unified_index()
-            self.initialize_other_retrievers()
+            # Only the requested methods are built; the others are built when they are first used
+            methods = list(methods) if methods is not None else list(DOCUMENT_MODELS) + SPARSE_METHODS
+            self.create_unified_index([method for method in DOCUMENT_MODELS if method in methods])
+            self.initialize_other_retrievers(methods)
         else:
-            self.dpr_query_encoder = None
-            self.encoder = None
             self.other_retrievers = {}
 
-    def create_unified_index(self):
-        logging.info("Creating unified index")
+    def create_unified_index(self, methods=tuple(DOCUMENT_MODELS)):
+        """
+        Builds one FAISS index per vector method, each holding only its own model's embeddings.
+        The index type (flat, HNSW, IVF-Flat or IVF-PQ) follows self.index_type, by default chosen by corpus size.
+        """
+        logging.info(f"Creating unified index for {', '.join(methods) or 'no vector method'}")
+        for method in methods:
+            self.indexes[method] = self._build_dense_index(method)
+
+    def _build_dense_index(self, method):
         texts = [doc[self.on[0]] for doc in self.documents]
-        
-        dpr_embeddings = self.encode_batch(texts, self.dpr_encoder)
-        encoder_embeddings = self.encode_batch(texts, self.encoder)
-        
-        unified_embeddings = torch.cat([dpr_embeddings, encoder_embeddings], dim=1)
-        
-        embedding_dim = unified_embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(embedding_dim)
+        embeddings = self.embeddings.corpus_embeddings(texts, DOCUMENT_MODELS[method])
+        index = create_index(embeddings, self.index_type, use_gpu=(self.device == "cuda"))
+        index.add(embeddings)
+        logging.info(f"Created {method} index with dimension {embeddings.shape[1]}")
+        return index
+
+    @property
+    def device(self):
+        return self.embeddings.device
+
+    def _to_device(self, index):
+        import faiss
         if self.device == "cuda":
-            self.gpu_resource = faiss.StandardGpuResources()
-            self.index = faiss.index_cpu_to_gpu(self.gpu_resource, 0, self.index)
-        
-        self.index.add(unified_embeddings.cpu().numpy())
-        logging.info(f"Created unified index with dimension {embedding_dim}")
+            if not hasattr(self, 'gpu_resource'):
+                self.gpu_resource = faiss.StandardGpuResources()
+            return faiss.index_cpu_to_gpu(self.gpu_resource, 0, index)
+        return index
+
+
+    def analyzed_documents(self):
+        """The documents as the sparse retrievers index them, analyzed once and shared by all of them."""
+        with self._analysis_lock:
+            if self._analyzed_documents is None:
+                self._analyzed_documents = self.analyzer.analyze_documents(self.documents, self.key, self.on)
+        return self._analyzed_documents
 
+    def _golden_retriever(self, method, retriever=None):
+        from .retrievers.golden import DocumentRetriever as GoldenDocumentRetriever
+        # A prebuilt retriever indexes nothing, so the corpus only needs analyzing when one is built
+        analyzed = method in ANALYZED_METHODS and retriever is None
+        return GoldenDocumentRetriever(
+            method=method,
+            documents=self.analyzed_documents() if analyzed else self.documents,
+            on=["text"] if analyzed else self.on,
+            key=self.key,
+            # Only the embedding method can use the GPU; checking the device would import torch
+            use_gpu=(method == "embedding" and self.device == "cuda"),
+            embedding_service=self.embeddings,
+            index_type=self.index_type,
+            retriever=retriever,
+            analyzer=self.analyzer
+        )
 
-    def initialize_other_retrievers(self):
+    def initialize_other_retrievers(self, methods=None):
+        methods = methods if methods is not None else list(DOCUMENT_MODELS) + SPARSE_METHODS
         self.other_retrievers = {}
-        methods = ["bm25", "tfidf", "flash", "lunr", "fuzz", "embedding"]
-        
-        for method in methods:
+        for method in SPARSE_METHODS:
+            if method not in methods:
+                continue
             try:
-                self.other_retrievers[method] = GoldenDocumentRetriever(
-                    method=method,
-                    documents=self.documents,
-                    on=self.on,
-                    key=self.key,
-                    use_gpu=(self.device == "cuda")
-                )
+                self.other_retrievers[method] = self._golden_retriever(method)
                 logging.info(f"Initialized {method} retriever")
             except Exception as e:
                 logging.error(f"Failed to initialize {method} retriever: {str(e)}", exc_info=True)
         
         # Initialize DPR and Encoder separately
-        try:
-            self.other_retrievers['dpr'] = DPRRetriever(self.documents, key=self.key, on=self.on)
-            logging.info("Initialized DPR retriever")
-        except Exception as e:
-            logging.error(f"Failed to initialize DPR retriever: {str(e)}", exc_info=True)
+        if 'dpr' in methods:
+            from .retrievers.dpr import DPRRetriever
+            try:
+                self.other_retrievers['dpr'] = DPRRetriever(self.documents, key=self.key, on=self.on,
+                                                             embedding_service=self.embeddings, index_type=self.index_type)
+                logging.info("Initialized DPR retriever")
+            except Exception as e:
+                logging.error(f"Failed to initialize DPR retriever: {str(e)}", exc_info=True)
         
+        if 'encoder' not in methods:
+            return
+        from .retrievers.encoder import DocumentRetriever as EncoderDocumentRetriever
         try:
-            self.other_retrievers['encoder'] = EncoderDocumentRetriever(self.documents, key=self.key, on=self.on)
+            self.other_retrievers['encoder'] = EncoderDocumentRetriever(self.documents, key=self.key, on=self.on,
+                                                                     embedding_service=self.embeddings,
+                                                                     index_type=self.index_type)
             logging.info("Initialized Encoder retriever")
         except Exception as e:
             logging.error(f"Failed to initialize Encoder retriever: {str(e)}", exc_info=True)
 
-    def encode_batch(self, texts, model):
+    def encode_batch(self, texts, model_name):
         logging.debug(f"Encoding batch of {len(texts)} texts")
-        embeddings = []
-        for i in tqdm(range(0, len(texts), self.batch_size), desc="Batches"):
-            batch = texts[i:i+self.batch_size]
-            with torch.no_grad():
-                batch_embeddings = model.encode(batch, convert_to_tensor=True, device=self.device)
-                embeddings.append(batch_embeddings.cpu())
-        return torch.cat(embeddings)
-
-    def retrieve(self, query, method, k=10):
+        return self.embeddings.encode(texts, model_name, show_progress=True)
+
+    def use_query_embeddings(self, store):
+        """Answers queries from a QueryEmbeddingStore (e.g. the clause library) instead of encoding them."""
+        self.query_embeddings = store
+        for retriever in self.other_retrievers.values():
+            if hasattr(retriever, 'query_embeddings'):
+                retriever.query_embeddings = store
+
+    def encode_queries(self, queries, model_name):
+        texts = [query_text(query) for query in queries]
+        if self.query_embeddings is not None:
+            query_embeddings = self.query_embeddings.lookup(texts, model_name)
+            if query_embeddings is not None:
+                return query_embeddings
+        return self.embeddings.encode(texts, model_name, use_cache=False)
+
+    def retrieve(self, query, method, k=10, min_threshold=0):
+        """
+        Returns the top k documents for query. Documents whose similarity falls below min_threshold,
+        on the analyser's scale (see scores.py), are dropped inside the retriever.
+        """
         logging.info(f"UnifiedRetriever: Retrieving with method: {method}")
+        min_score = raw_threshold(method, min_threshold)
+        if unreachable(method, min_threshold):
+            logging.info(f"Skipping {method}: none of its scores can reach {min_threshold}")
+            return self.empty_results(method)
         
         # Extract the 'Clause' value if query is a dictionary
         if isinstance(query, dict) and 'Clause' in query:
@@ -112,79 +181,281 @@ class UnifiedRetriever:
     
         try:
             if method in ["dpr", "encoder"]:
-                return self.retrieve_vector(query, method, k)
-            elif method in self.other_retrievers or method in ["bm25", "tfidf", "flash", "lunr", "fuzz", "embedding"]:
+                return self.retrieve_vector(query, method, k, min_score)
+            elif method in self.other_retrievers or method in SPARSE_METHODS:
                 if method not in self.other_retrievers:
                     self.initialize_retriever(method)
-                return self.other_retrievers[method].retrieve(query, k=k)
+                return self.other_retrievers[method].retrieve(query, k=k, min_score=min_score)
             else:
                 raise ValueError(f"Unknown method: {method}")
         except Exception as e:
             logging.error(f"Error in UnifiedRetriever retrieve method for {method}: {str(e)}", exc_info=True)
             raise
 
-    def retrieve_vector(self, query, method, k=10):
-        logging.debug(f"Performing vector retrieval for method: {method}")
-        if method == "dpr":
-            if self.dpr_query_encoder is None:
-                self.dpr_query_encoder = SentenceTransformer('facebook-dpr-question_encoder-single-nq-base', device=self.device)
-            query_embedding = self.dpr_query_encoder.encode([query], convert_to_tensor=True, device=self.device)
-        elif method == "encoder":
-            if self.encoder is None:
-                self.encoder = SentenceTransformer("sentence-transformers/all-mpnet-base-v2", device=self.device)
-            query_embedding = self.encoder.encode([query], convert_to_tensor=True, device=self.device)
-        
-        # Pad the query embedding to match the unified embedding size
-        padding_size = self.index.d - query_embedding.shape[1]
-        padded_query_embedding = torch.cat([query_embedding, torch.zeros(1, padding_size, device=self.device)], dim=1)
+    def retrieve_batch(self, queries, methods, k=10, batch_size=64, min_threshold=0, threads=None):
+        """
+        Retrieves every query with every method and returns {query_id: {method: results}}, where
+        results has the same shape as retrieve(query, method, k). queries maps query IDs to query
+        strings or clause records.
+
+        Dense methods encode all queries in batches and run a single FAISS search per method;
+        the other methods go through cherche's list-of-queries path. A method that fails is
+        logged and left out of the results. Documents below min_threshold are dropped as in retrieve().
+        threads caps the cores a multi-threaded sparse method (fuzz) may use; dense methods follow
+        the process-wide torch and FAISS settings.
+        """
+        query_ids = list(queries)
+        texts = [query_text(queries[query_id]) for query_id in query_ids]
+        results = {query_id: {} for query_id in query_ids}
+        if not texts:
+            return results
+
+        for method in methods:
+            logging.info(f"UnifiedRetriever: Retrieving {len(texts)} queries with method: {method}")
+            min_score = raw_threshold(method, min_threshold)
+            if unreachable(method, min_threshold):
+                # Nothing is built, encoded or searched for a method whose results would all be dropped
+                logging.info(f"Skipping {method}: none of its scores can reach {min_threshold}")
+                for query_id in query_ids:
+                    results[query_id][method] = self.empty_results(method)
+                continue
+            try:
+                if method in VECTOR_MODELS:
+                    method_results = self.retrieve_vector_batch(texts, method, k, min_score)
+                elif method in self.other_retrievers or method in SPARSE_METHODS:
+                    if method not in self.other_retrievers:
+                        self.initialize_retriever(method)
+                    rankings = self.other_retrievers[method].retrieve(texts, k=k, batch_size=batch_size, min_score=min_score,
+                                                                      threads=threads)
+                    if method == "embedding":
+                        # cherche's Embedding answers a one-row query matrix with a bare ranking
+                        method_results = [rankings] if len(texts) == 1 else rankings
+                    else:
+                        # retrieve() passes a single query as a one-element list and gets a list of rankings back
+                        method_results = [[ranking] for ranking in rankings]
+                else:
+                    raise ValueError(f"Unknown method: {method}")
+            except Exception as e:
+                logging.error(f"Error retrieving {len(texts)} queries with method {method}: {str(e)}", exc_info=True)
+                continue
+            for query_id, method_result in zip(query_ids, method_results):
+                results[query_id][method] = method_result
+        return results
+
+    @staticmethod
+    def empty_results(method):
+        """What retrieve() returns for a query without results: a bare ranking for the dense methods."""
+        return [] if method in VECTOR_MODELS or method == "embedding" else [[]]
+
+    def retrieve_vector(self, query, method, k=10, min_score=0):
+        return self.retrieve_vector_batch([query], method, k, min_score)[0]
+
+    def retrieve_vector_batch(self, queries, method, k=10, min_score=0):
+        logging.debug(f"Performing vector retrieval of {len(queries)} queries for method: {method}")
+        if method not in VECTOR_MODELS:
+            raise ValueError(f"Unknown vector method: {method}")
+        query_embeddings = self.encode_queries(queries, VECTOR_MODELS[method])
         
-        # Perform search
-        distances, indices = self.index.search(padded_query_embedding.cpu().numpy(), k)
+        # Perform one search for the whole batch, in the method's own embedding space
+        distances, indices = self.dense_index(method).search(query_embeddings, k)
         
-        # Prepare results
+        # Prepare results; FAISS pads with -1 when k exceeds the number of documents
         results = []
-        for i, distance in zip(indices[0], distances[0]):
-            results.append({
+        similarities = 1 / (1 + distances)
+        for row_indices, row_similarities in zip(indices, similarities):
+            results.append([{
                 "id": self.documents[i][self.key],
-                "similarity": float(1 / (1 + distance))  # Convert to float for JSON serialization
-            })
+                "similarity": float(similarity)  # Convert to float for JSON serialization
+            } for i, similarity in zip(row_indices, row_similarities) if i >= 0 and similarity >= min_score])
         
-        logging.debug(f"Retrieved {len(results)} results")
+        logging.debug(f"Retrieved results for {len(results)} queries")
         return results
 
     def initialize_retriever(self, method):
         if method not in self.other_retrievers:
+            persisted = self.sparse_store is not None and method in PERSISTED_METHODS
+            prebuilt = self.sparse_store.load(method) if persisted else None
             try:
-                self.other_retrievers[method] = GoldenDocumentRetriever(
-                    method=method,
-                    documents=self.documents,
-                    on=self.on,
-                    key=self.key,
-                    use_gpu=(self.device == "cuda")
-                )
+                self.other_retrievers[method] = self._golden_retriever(method, prebuilt)
+                self.other_retrievers[method].query_embeddings = self.query_embeddings
                 logging.info(f"Initialized {method} retriever")
             except Exception as e:
                 logging.error(f"Failed to initialize {method} retriever: {str(e)}", exc_info=True)
+                return
+            if persisted and prebuilt is None:
+                self._save_sparse_index(method)
 
-    def save_index(self, file_path):
-        logging.info(f"Saving index to {file_path}")
+    def _save_sparse_index(self, method):
+        try:
+            self.sparse_store.save(method, self.other_retrievers[method].retriever)
+        except Exception as e:
+            logging.warning(f"Could not save the {method} index: {e}")
+
+    @staticmethod
+    def index_paths(file_path):
+        """Maps each vector method to its index file: unified_index.faiss -> unified_index.dpr.faiss, ..."""
+        path = Path(file_path)
+        return {method: path.with_name(f"{path.stem}.{method}{path.suffix}") for method in DOCUMENT_MODELS}
+
+    @staticmethod
+    def dense_manifest_path(file_path):
+        """unified_index.faiss -> unified_index.dense.json"""
+        path = Path(file_path)
+        return path.with_name(f"{path.stem}.dense.json")
+
+    def _current_dense_methods(self, file_path):
+        """
+        The vector methods whose saved index was built from the current documents, according to the dense
+        manifest, which records the same corpus fingerprint as the sparse store. Indexes saved without a
+        manifest, or for other documents, are not listed and are rebuilt when they are first used.
+        """
+        manifest_path = self.dense_manifest_path(file_path)
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable dense index manifest {manifest_path}: {e}")
+            return set()
+        if manifest.get("corpus_fingerprint") != self.sparse_store.fingerprint:
+            return set()
+        return set(manifest.get("methods", []))
+
+    def _write_dense_manifest(self, file_path, methods):
+        manifest = {"corpus_fingerprint": self.sparse_store.fingerprint, "documents": len(self.documents),
+                    "methods": sorted(methods)}
+        manifest_path = self.dense_manifest_path(file_path)
+        fd, tmp_path = tempfile.mkstemp(dir=manifest_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, manifest_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def index_exists(cls, file_path):
+        """
+        True if anything was saved at file_path: a per-model index, a legacy concatenated index or the
+        sparse indexes. Indexes of methods that were not built yet are built when they are first used.
+        """
+        return (any(path.exists() for path in cls.index_paths(file_path).values()) or Path(file_path).exists()
+                or SparseIndexStore.directory_for(file_path).exists())
+
+    def dense_index(self, method):
+        """
+        Returns the FAISS index of a vector method, reading it from disk on first use after load_index().
+        A method that has no saved index yet (the project was indexed for other methods) is built and saved.
+        """
+        if method not in self.indexes:
+            if self._index_file is None:
+                raise ValueError(f"No {method} index has been built or loaded")
+            self._read_dense_indexes()
+        if method not in self.indexes:
+            logging.info(f"No saved {method} index at {self._index_file}, building it")
+            self.indexes[method] = self._build_dense_index(method)
+            self._save_dense_indexes(self._index_file, {method: self.indexes[method]})
+        return self.indexes[method]
+
+    def _write_indexes(self, file_path, indexes):
+        import faiss
+        paths = self.index_paths(file_path)
+        current = {method for method in self._current_dense_methods(file_path) if paths[method].exists()}
+        for method, index in indexes.items():
+            logging.info(f"Saving {method} index to {paths[method]}")
+            faiss.write_index(index, str(paths[method]))
+        # The manifest is written last, so it never lists an index that was not fully written
+        self._write_dense_manifest(file_path, current | set(indexes))
+
+    def _save_dense_indexes(self, file_path, indexes):
+        if not indexes:
+            return
         if self.device == "cuda":
-            index_cpu = faiss.index_gpu_to_cpu(self.index)
-        else:
-            index_cpu = self.index
-        faiss.write_index(index_cpu, str(file_path))
+            import faiss
+            indexes = {method: faiss.index_gpu_to_cpu(index) for method, index in indexes.items()}
+        self._write_indexes(file_path, indexes)
+
+    def save_index(self, file_path):
+        """Saves the indexes built so far; the retriever then builds and saves any other index next to them."""
+        if self._index_file is not None:
+            self._read_dense_indexes()
+        # The sparse store's corpus fingerprint is recorded in the dense manifest too
+        self.sparse_store = SparseIndexStore(SparseIndexStore.directory_for(file_path), self.documents, self.key, self.on,
+                                             self.analyzer.signature())
+        self._save_dense_indexes(file_path, dict(self.indexes))
+        
+        # Persist the sparse retrievers too, so that reloading the project does not rebuild them
+        for method in PERSISTED_METHODS:
+            if method in self.other_retrievers:
+                self._save_sparse_index(method)
+        self._index_file = file_path
         logging.info(f"Saved index to {file_path}")
     
-    def load_index(self, file_path):
-        logging.info(f"Loading index from {file_path}")
-        self.index = faiss.read_index(str(file_path))
-        if self.device == "cuda":
-            self.gpu_resource = faiss.StandardGpuResources()
-            self.index = faiss.index_cpu_to_gpu(self.gpu_resource, 0, self.index)
+    def load_index(self, file_path, mmap=False):
+        """
+        Attaches the indexes saved at file_path. Sparse retrievers are restored from the
+        SparseIndexStore and the dense indexes are read when a dense method first needs them.
+        """
+        self.sparse_store = SparseIndexStore(SparseIndexStore.directory_for(file_path), self.documents, self.key, self.on,
+                                             self.analyzer.signature())
+        self.indexes = {}
+        self._index_file = file_path
+        self._index_mmap = mmap
+        logging.info(f"Attached index {file_path}")
+
+    def _read_dense_indexes(self):
+        file_path = self._index_file
+        saved = {method: path for method, path in self.index_paths(file_path).items() if path.exists()}
+        current = self._current_dense_methods(file_path)
+        stale = sorted(method for method in saved if method not in current and method not in self.indexes)
+        if stale:
+            logging.info(f"The saved {', '.join(stale)} index at {file_path} does not match the documents; it will be rebuilt")
+        paths = {method: path for method, path in saved.items() if method in current and method not in self.indexes}
+        if paths:
+            # A memory-mapped index cannot be moved to the GPU without copying it, so mmap only applies on CPU
+            mmap = self._index_mmap and self.device != "cuda"
+            for method, path in paths.items():
+                logging.info(f"Loading {method} index from {path}{' (memory-mapped)' if mmap else ''}")
+                self.indexes[method] = self._to_device(read_index(path, mmap))
+        elif not saved and Path(file_path).exists():
+            indexes = self._split_legacy_index(file_path)
+            if not indexes:
+                return
+            # Convert once so that later runs load the per-model files directly
+            try:
+                self._write_indexes(file_path, indexes)
+            except (OSError, RuntimeError) as e:
+                logging.warning(f"Could not save per-model indexes next to {file_path}: {e}")
+            self.indexes = {method: self._to_device(index) for method, index in indexes.items()}
+        else:
+            return
         logging.info(f"Loaded index from {file_path}")
 
+    def _split_legacy_index(self, file_path):
+        """Splits an index of concatenated [DPR | mpnet] vectors into one flat index per model, or returns {} if it is stale."""
+        import faiss
+        logging.info(f"Splitting legacy unified index {file_path} into per-model indexes")
+        legacy_index = faiss.read_index(str(file_path))
+        # The legacy index has no manifest; one with another number of vectors was built from other documents
+        if legacy_index.ntotal != len(self.documents):
+            logging.info(f"Legacy index {file_path} holds {legacy_index.ntotal} vectors for {len(self.documents)} documents; rebuilding")
+            return {}
+        vectors = legacy_index.reconstruct_n(0, legacy_index.ntotal)
+        indexes = {}
+        offset = 0
+        for method, model_name in DOCUMENT_MODELS.items():
+            dimension = self.embeddings.dimension(model_name)
+            indexes[method] = faiss.IndexFlatL2(dimension)
+            indexes[method].add(np.ascontiguousarray(vectors[:, offset:offset + dimension]))
+            offset += dimension
+        if offset != legacy_index.d:
+            raise ValueError(f"Legacy index {file_path} has dimension {legacy_index.d}, expected {offset}")
+        return indexes
+
     @classmethod
-    def load(cls, documents, index_path, **kwargs):
+    def load(cls, documents, index_path, mmap=False, **kwargs):
         instance = cls(documents, load_existing=True, **kwargs)
-        instance.load_index(index_path)
+        instance.load_index(index_path, mmap)
         return instance
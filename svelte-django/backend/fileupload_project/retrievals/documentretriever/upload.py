@@ -1,20 +1,116 @@
 import os
+import json
+import stat
 import argparse
 import shutil
+import hashlib
 import logging
 import random
 import string
+import tempfile
 from datetime import datetime
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def save_files_to_timestamped_folder(folder_path):
+class BlobStore:
+    """
+    Content-addressed store: every distinct file is kept once as <blob_dir>/<sha256[:2]>/<sha256>.
+    Blobs are read-only so that the hardlinked views handed out by link() cannot modify them.
+    A small stat index (path, size, mtime, inode -> hash) lets repeated runs skip re-hashing
+    files that have not changed. Entries of files that were since deleted or modified are
+    dropped when the index is saved.
+    """
+
+    def __init__(self, blob_dir):
+        self.blob_dir = blob_dir
+        self.index_path = os.path.join(blob_dir, 'index.json')
+        os.makedirs(blob_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {}
+        self.new_blobs = 0
+        self.reused_blobs = 0
+
+    @staticmethod
+    def _stat_key(file_path):
+        st = os.stat(file_path)
+        return f"{os.path.abspath(file_path)}:{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+
+    def hash_file(self, file_path, chunk_size=1024 * 1024):
+        stat_key = self._stat_key(file_path)
+        if stat_key in self.index:
+            return self.index[stat_key]
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha256.update(chunk)
+        self.index[stat_key] = sha256.hexdigest()
+        return self.index[stat_key]
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def add(self, file_path):
+        """Stores file_path unless identical content is already present. Returns the blob path."""
+        blob_path = self.blob_path(self.hash_file(file_path))
+        if os.path.exists(blob_path):
+            self.reused_blobs += 1
+            return blob_path
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copy2(file_path, tmp_path)
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp_path, blob_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.new_blobs += 1
+        return blob_path
+
+    @staticmethod
+    def link(blob_path, destination_path):
+        """Exposes a blob at destination_path as a hardlink, falling back to a copy across filesystems."""
+        try:
+            os.link(blob_path, destination_path)
+        except OSError as e:
+            logging.debug(f"Hardlink failed for {destination_path} ({e}), copying instead")
+            shutil.copy2(blob_path, destination_path)
+
+    def _is_current(self, stat_key):
+        """True if the file of a stat index key still exists with the same size, mtime and inode."""
+        file_path = stat_key.rsplit(':', 3)[0]
+        try:
+            return self._stat_key(file_path) == stat_key
+        except OSError:
+            return False
+
+    def save_index(self):
+        stale = [stat_key for stat_key in self.index if not self._is_current(stat_key)]
+        for stat_key in stale:
+            del self.index[stat_key]
+        if stale:
+            logging.debug(f"Dropped {len(stale)} stale entries from the blob store index")
+        fd, tmp_path = tempfile.mkstemp(dir=self.blob_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+def save_files_to_timestamped_folder(folder_path, blob_dir=None):
     # Create the main "all_files" folder if it doesn't exist
     main_folder = "all_files"
     os.makedirs(main_folder, exist_ok=True)
     logging.info(f"Ensuring main folder exists: {main_folder}")
 
+    # File contents live once in the blob store; the timestamped folder only holds links to them
+    store = BlobStore(blob_dir if blob_dir else os.path.join(main_folder, '.blobs'))
+
     # Create a timestamped subfolder
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     destination_folder = os.path.join(main_folder, timestamp)
@@ -46,19 +142,22 @@ def save_files_to_timestamped_folder(folder_path):
             # Create necessary subfolders in the destination path
             os.makedirs(os.path.dirname(destination_path), exist_ok=True)
             
-            # Copy file to the destination path
+            # Store the file once by content and link it into the destination path
             try:
-                shutil.copy2(file_path, destination_path)
-                logging.info(f"Copied file: {file_path} to {destination_path}")
+                store.link(store.add(file_path), destination_path)
+                logging.info(f"Linked file: {file_path} to {destination_path}")
             except Exception as e:
-                logging.error(f"Error copying file {file_path}: {str(e)}")
+                logging.error(f"Error storing file {file_path}: {str(e)}")
 
+    store.save_index()
+    logging.info(f"Blob store: {store.new_blobs} new file(s) stored, {store.reused_blobs} already present")
     return destination_folder
 
 def main():
     # Set up argument parsing
     parser = argparse.ArgumentParser(description="Upload files from a folder to a timestamped folder.")
     parser.add_argument('folder_path', type=str, help="Path to the folder containing files to be uploaded")
+    parser.add_argument('--blob-dir', type=str, help="Directory of the content-addressed file store (default: all_files/.blobs)")
     args = parser.parse_args()
 
     # Check if the provided path is a directory
@@ -68,7 +167,7 @@ def main():
 
     try:
         # Save files to the timestamped folder and get the destination folder path
-        destination_folder = save_files_to_timestamped_folder(args.folder_path)
+        destination_folder = save_files_to_timestamped_folder(args.folder_path, args.blob_dir)
         
         # Print and log the path where files were saved
         message = f"Files have been saved to {destination_folder}"
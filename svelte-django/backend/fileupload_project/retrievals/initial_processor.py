@@ -10,6 +10,8 @@ from tqdm import tqdm
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from documentretriever.unified_retriever import UnifiedRetriever
+from documentretriever.documents_io import load_documents
+from documentretriever.retrievers.index_factory import INDEX_TYPES
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -29,7 +31,7 @@ def extract_path(output, prefix):
             return line.split(prefix)[-1].strip()
     raise ValueError(f"Could not find path in output: {output}")
 
-def process_documents(tenderdocs, min_chars, min_words, output_dir):
+def process_documents(tenderdocs, min_chars, min_words, output_dir, workers=1):
     logging.info("Starting document processing...")
     
     upload_output = run_script('upload', tenderdocs)
@@ -39,18 +41,18 @@ def process_documents(tenderdocs, min_chars, min_words, output_dir):
     process_output = run_script('process', destination_folder, 
                                 '--min-chars', str(min_chars),
                                 '--min-words', str(min_words),
-                                '--output-dir', output_dir)
+                                '--output-dir', output_dir,
+                                '--workers', str(workers))
     json_output_path = extract_path(process_output, "Files have been saved to")
     logging.info(f"Documents processed. Output saved to: {json_output_path}")
     
     return json_output_path
 
-def preprocess_documents(json_output_path, output_dir):
+def preprocess_documents(json_output_path, output_dir, index_type="auto"):
     logging.info("Starting document preprocessing...")
-    with open(json_output_path, 'r') as f:
-        documents = json.load(f)
+    documents = load_documents(json_output_path)
     
-    retriever = UnifiedRetriever(documents, on=["text"])
+    retriever = UnifiedRetriever(documents, on=["text"], index_type=index_type)
     
     index_path = os.path.join(output_dir, 'unified_index.faiss')
     retriever.save_index(index_path)
@@ -66,15 +68,19 @@ def main():
     parser.add_argument("--min-words", type=int, default=30, 
                         help="Minimum number of words for a paragraph before merging")
     parser.add_argument("--output-dir", type=str, default="./output",
-                        help="Directory to save the extracted_data.json and unified_index.faiss files")
+                        help="Directory to save the extracted_data.jsonl and unified_index.{dpr,encoder}.faiss files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes used to extract documents in parallel")
+    parser.add_argument("--index-type", type=str, choices=INDEX_TYPES, default="auto",
+                        help="FAISS index type (auto picks flat, hnsw, ivf-flat or ivf-pq by corpus size)")
     args = parser.parse_args()
     
     try:
         # Create the output directory if it doesn't exist
         os.makedirs(args.output_dir, exist_ok=True)
         
-        processed_docs_path = process_documents(args.tenderdocs, args.min_chars, args.min_words, args.output_dir)
-        index_path = preprocess_documents(processed_docs_path, args.output_dir)
+        processed_docs_path = process_documents(args.tenderdocs, args.min_chars, args.min_words, args.output_dir, args.workers)
+        index_path = preprocess_documents(processed_docs_path, args.output_dir, args.index_type)
         
         logging.info("Preprocessing completed successfully.")
         
@@ -5,7 +5,7 @@ import logging
 import sys
 import argparse
 from pathlib import Path
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 # Set environment variable to avoid tokenizer parallelism warning
@@ -20,6 +20,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 from documentretriever.unified_retriever import UnifiedRetriever
+from documentretriever.retrievers.embeddings import EmbeddingService
+from documentretriever.retrievers.query_embeddings import QueryEmbeddingStore
+from documentretriever.retrievers.index_factory import INDEX_TYPES
+from documentretriever.retrievers.embedding_cache import EmbeddingCache, CACHE_DIR_ENV, DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE_MB
+from documentretriever.documents_io import load_documents as read_documents
+from documentretriever.scores import unreachable
 
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -34,8 +40,7 @@ class NumpyEncoder(json.JSONEncoder):
 def load_documents(file_path):
     logging.info(f"Attempting to load documents from: {file_path}")
     if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            documents = json.load(f)
+        documents = read_documents(file_path)
         logging.info(f"Loaded {len(documents)} documents")
         if documents:
             logging.debug(f"First document: {documents[0]}")
@@ -47,40 +52,132 @@ def load_documents(file_path):
     return documents
 
 
-def process_queries(retriever, queries, methods, k=5):
-    results = {}
-    for query_id, query_text in tqdm(queries.items(), desc="Processing queries"):
-        logging.debug(f"Processing query: {query_id}, text: {query_text}")
-        results[query_id] = {}
+DENSE_METHODS = ("dpr", "encoder", "embedding")
+
+def plan_method_threads(methods, workers):
+    """
+    Splits `workers` cores between the methods. Sparse methods (BM25, TF-IDF, Lunr, Fuzz, Flash) run
+    side by side with one core each; Fuzz, the only multi-threaded one, is capped to its lane's share
+    of the cores left by the dense lane (see process_queries). Dense methods share one lane
+    that runs them one after the other with the remaining cores, because torch and FAISS thread
+    counts are process-wide. Returns (concurrent sparse methods, dense threads).
+    """
+    sparse_count = sum(1 for method in methods if method not in DENSE_METHODS)
+    if sparse_count == len(methods):
+        return min(sparse_count, workers), 0
+    sparse_workers = min(sparse_count, workers // 2)
+    return sparse_workers, max(1, workers - sparse_workers)
+
+def limit_dense_threads(threads):
+    import torch
+    import faiss
+    torch.set_num_threads(threads)
+    faiss.omp_set_num_threads(threads)
+    logging.info(f"Dense retrieval limited to {threads} thread(s)")
+
+def reachable_methods(methods, min_threshold=0):
+    """The methods whose scores can reach min_threshold; the others would only return empty results."""
+    return [method for method in methods if not unreachable(method, min_threshold)]
+
+def process_queries(retriever, queries, methods, k=5, workers=None, min_threshold=0):
+    logging.info(f"Processing {len(queries)} queries with methods: {', '.join(methods)}")
+    workers = workers or os.cpu_count() or 1
+    # Methods that cannot reach the threshold take no lane and no threads; they get empty results below
+    requested, methods = methods, reachable_methods(methods, min_threshold)
+    sparse_workers, dense_threads = plan_method_threads(methods, workers)
+    dense_methods = [method for method in methods if method in DENSE_METHODS]
+    sparse_methods = [method for method in methods if method not in DENSE_METHODS]
+
+    if dense_threads:
+        limit_dense_threads(dense_threads)
+
+    if len(methods) <= 1 or sparse_workers == 0:
+        # One batched call per method instead of one encoder pass and one search per query
+        results = retriever.retrieve_batch(queries, methods, k=k, min_threshold=min_threshold, threads=workers)
+    else:
+        lanes = ([dense_methods] if dense_methods else []) + [[method] for method in sparse_methods]
+        # The cores not given to the dense lane are split between the sparse lanes (only fuzz is multi-threaded)
+        sparse_threads = max(1, (workers - dense_threads) // len(sparse_methods))
+        logging.info(f"Running {len(sparse_methods)} sparse method(s) on {sparse_workers} thread(s)"
+                     + (f" alongside the dense lane ({', '.join(dense_methods)})" if dense_methods else ""))
+        with ThreadPoolExecutor(max_workers=sparse_workers + (1 if dense_methods else 0)) as executor:
+            lane_results = [executor.submit(retriever.retrieve_batch, queries, lane, k, min_threshold=min_threshold,
+                                            threads=None if lane is dense_methods else sparse_threads)
+                            for lane in lanes]
+            lane_results = [future.result() for future in lane_results]
+        # Merge the lanes back in the requested method order
+        results = {query_id: {} for query_id in queries}
         for method in methods:
-            try:
-                result = retriever.retrieve(query_text, method=method, k=k)
-                results[query_id][method] = result
-                logging.debug(f"Result for method {method}: {result[:2]}...")  # Log first 2 results
-            except Exception as e:
-                logging.error(f"Error processing query {query_id} with method {method}: {str(e)}")
+            for lane_result in lane_results:
+                for query_id, query_results in lane_result.items():
+                    if method in query_results:
+                        results[query_id][method] = query_results[method]
+    skipped = [method for method in requested if method not in methods]
+    if skipped:
+        skipped_results = retriever.retrieve_batch(queries, skipped, k=k, min_threshold=min_threshold)
+        # Back in the requested method order
+        results = {query_id: {method: {**query_results, **skipped_results[query_id]}[method]
+                              for method in requested if method in query_results or method in skipped}
+                   for query_id, query_results in results.items()}
+    for method in methods:
+        answered = sum(1 for query_results in results.values() if method in query_results)
+        if answered < len(queries):
+            logging.error(f"Method {method} returned no results for {len(queries) - answered} queries")
     return results
 
 def read_query_from_file(file_path):
     with open(file_path, 'r') as f:
         return f.read().strip()
 
-def main(processed_docs_path, methods, k=5, query_file=None, output_dir=None):
+def create_embedding_service(cache_dir=None, cache_mb=None, use_cache=True):
+    if not use_cache:
+        return EmbeddingService(cache=False)
+    if cache_dir or cache_mb:
+        cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+        return EmbeddingService(cache=EmbeddingCache(cache_dir, cache_mb or DEFAULT_MAX_SIZE_MB))
+    return EmbeddingService()
+
+def index_path_for(processed_docs_path):
+    return Path(processed_docs_path).parent / 'unified_index.faiss'
+
+def load_retriever(processed_docs_path, embedding_service=None, index_type="auto", mmap_index=False, methods=None):
+    """
+    Loads the unified index next to processed_docs_path, building and saving it if it does not exist yet.
+    A new index is only built for methods (default: all); other methods are built and saved when first used.
+    """
     documents = load_documents(processed_docs_path)
-    index_path = Path(processed_docs_path).parent / 'unified_index.faiss'
+    index_path = index_path_for(processed_docs_path)
     
     if not documents:
         logging.error("No documents loaded. Cannot proceed with retrieval.")
-        return
+        return None
 
-    if index_path.exists():
+    if UnifiedRetriever.index_exists(index_path):
         logging.info(f"Loading existing index from {index_path}")
-        retriever = UnifiedRetriever.load(documents, str(index_path), key="id", on=["text"])
+        retriever = UnifiedRetriever.load(documents, str(index_path), mmap=mmap_index, key="id", on=["text"],
+                                          embedding_service=embedding_service)
     else:
         logging.warning(f"Index not found at {index_path}. Creating new index.")
-        retriever = UnifiedRetriever(documents, key="id", on=["text"])
+        retriever = UnifiedRetriever(documents, key="id", on=["text"], embedding_service=embedding_service,
+                                     index_type=index_type, methods=methods)
         retriever.save_index(str(index_path))
+    return retriever
 
+def results_path(output_dir=None):
+    if output_dir:
+        return os.path.join(output_dir, 'retrieval_results.json')
+    return 'retrieval_results.json'
+
+def main(processed_docs_path, methods, k=5, query_file=None, output_dir=None, embedding_service=None, workers=None, index_type="auto", mmap_index=False, retriever=None, min_threshold=0):
+    """
+    Runs every query through methods and saves the results; pass retriever to reuse an already loaded index.
+    Results below min_threshold, on the analyser's scale, are dropped by the retrievers and never saved.
+    """
+    if retriever is None:
+        retriever = load_retriever(processed_docs_path, embedding_service, index_type, mmap_index,
+                                   reachable_methods(methods, min_threshold))
+    if retriever is None:
+        return None
 
     if query_file:
         # Process the single query from file
@@ -95,32 +192,42 @@ def main(processed_docs_path, methods, k=5, query_file=None, output_dir=None):
             with open(query_file_path, 'r') as f:
                 queries = json.load(f)
             logging.info(f"Total queries loaded from file: {len(queries)}")
+            # The clause library is the same for every project, so its embeddings are computed once and stored with it
+            retriever.use_query_embeddings(QueryEmbeddingStore(query_file_path, queries, retriever.embeddings))
         else:
             logging.warning(f"Query file not found: {query_file_path}. Using default query.")
             queries = {"default_query": "What is the main topic of these documents?"}
 
-    results = process_queries(retriever, queries, methods, k)
+    results = process_queries(retriever, queries, methods, k, workers, min_threshold)
 
     # Create the output directory if it doesn't exist
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, 'retrieval_results.json')
-    else:
-        output_file = 'retrieval_results.json'
+    output_file = results_path(output_dir)
 
     with open(output_file, 'w') as f:
         json.dump(results, f, indent=2, cls=NumpyEncoder)
     
     logging.info(f"Retrieval results saved to: {output_file}")
+    return results
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the document retrieval process.")
     parser.add_argument("--processed_docs", type=str, required=True, help="Path to the processed documents JSON file")
     parser.add_argument("--method", type=str, nargs='+', default=["bm25"], help="Retrieval methods to use")
     parser.add_argument("--k", type=int, default=5, help="Number of top results to retrieve")
+    parser.add_argument("--min_threshold", type=float, default=0, help="Drop results scoring below this on the analyser's scale (default: 0, keep all)")
     parser.add_argument("--query_file", type=str, help="Path to file containing a single query (optional)")
     parser.add_argument("--output_dir", type=str, help="Directory to save the retrieval_results.json file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Cores shared by the retrieval methods, which run concurrently")
+    parser.add_argument("--index_type", type=str, choices=INDEX_TYPES, default="auto", help="FAISS index type used when building a new index (auto picks one by corpus size)")
+    parser.add_argument("--mmap_index", action='store_true', help="Memory-map an existing index instead of reading it into RAM")
+    parser.add_argument("--embedding_cache_dir", type=str, help="Directory of the persistent embedding cache (default: $DOCUMENTRETRIEVER_EMBEDDING_CACHE or ~/.cache/documentretriever/embeddings)")
+    parser.add_argument("--embedding_cache_mb", type=float, help=f"Size limit of the embedding cache in MB (default: {DEFAULT_MAX_SIZE_MB})")
+    parser.add_argument("--no_embedding_cache", action='store_true', help="Encode every paragraph instead of reusing cached embeddings")
     args = parser.parse_args()
     
-    main(args.processed_docs, args.method, args.k, args.query_file, args.output_dir)
+    embedding_service = create_embedding_service(args.embedding_cache_dir, args.embedding_cache_mb, not args.no_embedding_cache)
+    main(args.processed_docs, args.method, args.k, args.query_file, args.output_dir, embedding_service, args.workers, args.index_type, args.mmap_index,
+         min_threshold=args.min_threshold)
 
@@ -0,0 +1,64 @@
+# tests/test_analyser.py
+
+import os
+import sys
+import copy
+import json
+import random
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import runner
+import analyser
+from documentretriever.unified_retriever import UnifiedRetriever
+from tests.test_retrievers import corpus
+
+SPARSE_METHODS = ["bm25", "tfidf", "lunr", "fuzz", "flash"]
+
+def analyse(results, documents, clauses, min_threshold=10, top_m_methods=3):
+    data = analyser.preprocess_data(copy.deepcopy(json.loads(json.dumps(results, cls=runner.NumpyEncoder))))
+    return analyser.analyze_retrieval_results(data, top_m_methods, min_threshold, 50, 1, {d["id"]: d for d in documents}, clauses)
+
+def rare_term_corpus(paragraphs=300, queries=20, seed=5):
+    """Long paragraphs over a large vocabulary, queried with 40-word passages, so that lunr scores exceed 10."""
+    rng = random.Random(seed)
+    vocabulary = sorted({"".join(rng.choice("bcdfghjklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+                         for _ in range(3000)})
+    documents = [{"id": i, "text": " ".join(rng.choice(vocabulary) for _ in range(rng.randint(40, 80)))}
+                 for i in range(paragraphs)]
+    clauses = {}
+    for i in range(queries):
+        words = documents[rng.randrange(paragraphs)]["text"].split()
+        start = rng.randrange(len(words) - 39)
+        clauses[str(i)] = {"Clause": " ".join(words[start:start + 40])}
+    return documents, clauses
+
+class ThresholdPushdownTest(unittest.TestCase):
+    def test_pushdown_gives_the_same_analysis(self):
+        documents, clauses = corpus(300, 30)
+        retriever = UnifiedRetriever(documents, load_existing=True)
+        full = runner.process_queries(retriever, clauses, SPARSE_METHODS, k=5, workers=2)
+        pushed = runner.process_queries(retriever, clauses, SPARSE_METHODS, k=5, workers=2, min_threshold=10)
+        self.assertLess(len(json.dumps(pushed, cls=runner.NumpyEncoder)), len(json.dumps(full, cls=runner.NumpyEncoder)))
+        self.assertEqual(analyse(full, documents, clauses), analyse(pushed, documents, clauses))
+
+    def test_pushdown_keeps_lunr_scores_above_the_threshold(self):
+        documents, clauses = rare_term_corpus()
+        retriever = UnifiedRetriever(documents, load_existing=True)
+        full = runner.process_queries(retriever, clauses, SPARSE_METHODS, k=5, workers=2)
+        pushed = runner.process_queries(retriever, clauses, SPARSE_METHODS, k=5, workers=2, min_threshold=10)
+        analysis = analyse(full, documents, clauses, top_m_methods=len(SPARSE_METHODS))
+        self.assertEqual(analysis, analyse(pushed, documents, clauses, top_m_methods=len(SPARSE_METHODS)))
+        lunr_scores = [matches["lunr"] for document in analysis.values()
+                       for matches in document["clause_ids"].values() if "lunr" in matches]
+        self.assertTrue(lunr_scores)
+        self.assertTrue(all(score > 10 for score in lunr_scores))
+
+    def test_empty_results_are_analysed(self):
+        documents, clauses = corpus(20, 2)
+        results = {clause_id: {"bm25": [[]], "dpr": [], "embedding": []} for clause_id in clauses}
+        self.assertEqual(analyse(results, documents, clauses), {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_dense_index.py
+
+import os
+import sys
+import zlib
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from documentretriever.unified_retriever import UnifiedRetriever
+
+class HashEmbeddingService:
+    """Deterministic stand-in for the sentence-transformer models: one vector per text, derived from its hash."""
+
+    device = "cpu"
+
+    def __init__(self):
+        self.encoded = []
+
+    def dimension(self, model_name):
+        return 8
+
+    def corpus_embeddings(self, texts, model_name):
+        self.encoded.append(model_name)
+        return np.stack([np.random.default_rng(zlib.crc32(text.encode('utf-8'))).random(8, dtype=np.float32)
+                         for text in texts])
+
+def documents(version):
+    return [{"id": i, "text": f"{version} paragraph {i} on the delivery schedule"} for i in range(20)]
+
+class DenseIndexFingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp.name, 'unified_index.faiss')
+        service = HashEmbeddingService()
+        UnifiedRetriever(documents("first"), embedding_service=service, methods=["dpr"]).save_index(self.index_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, docs):
+        service = HashEmbeddingService()
+        retriever = UnifiedRetriever.load(docs, self.index_path, embedding_service=service)
+        index = retriever.dense_index("dpr")
+        return service, index.reconstruct_n(0, index.ntotal)
+
+    def test_unchanged_documents_reuse_the_saved_index(self):
+        service, vectors = self.load(documents("first"))
+        self.assertEqual(service.encoded, [])
+        np.testing.assert_array_equal(vectors, HashEmbeddingService().corpus_embeddings(
+            [doc["text"] for doc in documents("first")], "dpr"))
+
+    def test_reprocessed_documents_rebuild_the_index(self):
+        service, vectors = self.load(documents("second"))
+        self.assertEqual(len(service.encoded), 1)
+        expected = HashEmbeddingService().corpus_embeddings([doc["text"] for doc in documents("second")], "dpr")
+        np.testing.assert_array_equal(vectors, expected)
+        # The rebuilt index is saved with the new fingerprint and reused by the next load
+        self.assertEqual(self.load(documents("second"))[0].encoded, [])
+
+    def test_index_saved_without_manifest_is_rebuilt(self):
+        os.remove(UnifiedRetriever.dense_manifest_path(self.index_path))
+        self.assertEqual(len(self.load(documents("first"))[0].encoded), 1)
+
+if __name__ == "__main__":
+    unittest.main()
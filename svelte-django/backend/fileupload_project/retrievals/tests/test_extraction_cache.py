@@ -0,0 +1,98 @@
+# tests/test_extraction_cache.py
+
+import os
+import sys
+import tempfile
+import unittest
+
+RETRIEVALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(RETRIEVALS_DIR, 'documentretriever'))
+
+import process
+from tests.test_process import write_text
+
+def paragraph(topic, i):
+    return (f"Section {i} sets out the {topic} obligations of the supplier, including the notice periods, "
+            f"the reporting duties and the remedies available to the buyer if clause {i} is breached.")
+
+class ExtractionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+        self.projects = {}
+        for project in ("alpha", "beta"):
+            folder = os.path.join(self.tmp.name, project)
+            os.makedirs(folder)
+            for i in range(2):
+                write_text(folder, f"{project}_{i}.txt", [paragraph(project, i)])
+            self.projects[project] = folder
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def process(self, project):
+        folder = self.projects[project]
+        return process.process_folder(folder, output_dir=os.path.join(self.tmp.name, 'out', project),
+                                      min_words=5, cache_dir=self.cache_dir)
+
+    def entries(self):
+        return {name for root, _, files in os.walk(self.cache_dir) if not root.endswith('folders')
+                for name in files if name.endswith('.json')}
+
+    def test_unchanged_files_are_reused(self):
+        first = self.process("alpha")
+        with self.assertLogs(level='INFO') as logs:
+            second = self.process("alpha")
+        self.assertIn("Extraction cache: 2 file(s) reused, 0 to extract", "\n".join(logs.output))
+        self.assertEqual(first["paragraphs"], second["paragraphs"])
+
+    def test_modified_file_is_extracted_again(self):
+        self.process("alpha")
+        write_text(self.projects["alpha"], "alpha_0.txt", [paragraph("revised", 0)])
+        with self.assertLogs(level='INFO') as logs:
+            self.process("alpha")
+        self.assertIn("Extraction cache: 1 file(s) reused, 1 to extract", "\n".join(logs.output))
+        # The entry of the old contents is pruned
+        self.assertEqual(len(self.entries()), 2)
+
+    def test_prune_keeps_other_folders_entries(self):
+        self.process("alpha")
+        self.process("beta")
+        self.assertEqual(len(self.entries()), 4)
+        os.remove(os.path.join(self.projects["alpha"], "alpha_1.txt"))
+        self.process("alpha")
+        self.assertEqual(len(self.entries()), 3)
+        with self.assertLogs(level='INFO') as logs:
+            self.process("beta")
+        self.assertIn("Extraction cache: 2 file(s) reused, 0 to extract", "\n".join(logs.output))
+
+    def test_prune_keeps_entries_shared_with_another_folder(self):
+        write_text(self.projects["beta"], "copy.txt", [paragraph("alpha", 1)])
+        self.process("alpha")
+        self.process("beta")
+        os.remove(os.path.join(self.projects["alpha"], "alpha_1.txt"))
+        self.process("alpha")
+        with self.assertLogs(level='INFO') as logs:
+            self.process("beta")
+        self.assertIn("Extraction cache: 3 file(s) reused, 0 to extract", "\n".join(logs.output))
+
+    def test_failed_file_is_not_cached(self):
+        # Invalid UTF-8 makes the text extractor raise, as a transient read error would
+        with open(os.path.join(self.projects["alpha"], "alpha_1.txt"), 'wb') as f:
+            f.write(b"\xff\xfe not utf-8 \xff")
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                summary = process.process_folder(self.projects["alpha"], os.path.join(self.tmp.name, 'out', str(workers)),
+                                                 min_words=5, cache_dir=self.cache_dir, workers=workers)
+                self.assertEqual([file for file, _ in summary["failed_files"]], ["alpha_1.txt"])
+                self.assertIn("UnicodeDecodeError", summary["failed_files"][0][1])
+                self.assertEqual(len(self.entries()), 1)
+
+        write_text(self.projects["alpha"], "alpha_1.txt", [paragraph("alpha", 1)])
+        with self.assertLogs(level='INFO') as logs:
+            summary = self.process("alpha")
+        self.assertIn("Extraction cache: 1 file(s) reused, 1 to extract", "\n".join(logs.output))
+        self.assertEqual(summary["failed_files"], [])
+
+if __name__ == "__main__":
+    unittest.main()
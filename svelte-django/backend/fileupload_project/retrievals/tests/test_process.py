@@ -0,0 +1,116 @@
+# tests/test_process.py
+#
+#   python -m unittest discover -s tests -t .     (from the retrievals directory)
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+RETRIEVALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(RETRIEVALS_DIR, 'documentretriever'))
+
+import process
+from documents_io import iter_records
+from supervised_pool import SupervisedPool
+
+SHARED = ("These terms and conditions apply to every order placed with the supplier under this framework "
+          "agreement, including any order placed by a call-off contract.")
+
+def write_text(folder, name, paragraphs):
+    with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+        f.write("\n\n".join(paragraphs))
+
+class ProcessFolderCountTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.documents = os.path.join(self.tmp.name, 'documents')
+        os.makedirs(self.documents)
+        for i in range(3):
+            write_text(self.documents, f"tender_{i}.txt", [
+                SHARED,
+                f"Lot {i} covers the delivery of {i + 2} vehicles to the depot, with maintenance for the first "
+                f"{i + 1} years and a replacement vehicle within {i + 3} working days of any breakdown.",
+            ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_duplicates_are_not_counted_as_paragraphs(self):
+        for dedup in ('exact', 'near'):
+            with self.subTest(dedup=dedup):
+                summary = process.process_folder(self.documents, os.path.join(self.tmp.name, dedup), min_words=5,
+                                                 dedup=dedup, use_cache=False)
+                records = list(iter_records(summary["output_file"]))
+                markers = [record for record in records if 'duplicate_of' in record]
+                self.assertEqual(summary["paragraphs"], 4)
+                self.assertEqual(summary["duplicates"], 2)
+                self.assertEqual(summary["paragraphs"], len(records) - len(markers))
+                self.assertEqual(summary["duplicates"], len(markers))
+
+    def test_min_chars_filter_counts_only_paragraphs(self):
+        summary = process.process_folder(self.documents, self.tmp.name, min_chars=140, min_words=5,
+                                         dedup='near', use_cache=False)
+        records = list(iter_records(summary["output_file"]))
+        self.assertEqual(summary["paragraphs"], sum(1 for record in records if 'duplicate_of' not in record))
+        self.assertTrue(all(len(record["text"]) >= 140 for record in records if 'duplicate_of' not in record))
+
+def misbehaving_page_count(file_path, engine='pdfplumber'):
+    # Stands in for a PDF library hanging on or crashing over a malformed file
+    if 'hangs' in file_path:
+        time.sleep(60)
+    if 'crashes' in file_path:
+        os._exit(139)
+    return 120
+
+def failing_middle_range(file_path, page_range=None):
+    # Stands in for pdfplumber raising on a page of the second range
+    if page_range and page_range[0] == 3:
+        raise ValueError("broken content stream")
+    for page in range(*page_range) if page_range else range(7):
+        yield f"Page {page + 1} lists the delivery obligations of the supplier for the depot named in the order."
+
+def write_blank_pdf(path, pages):
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        pdf.new_page(595, 842)
+    pdf.save(path)
+    pdf.close()
+
+class PdfSplittingTest(unittest.TestCase):
+    def test_page_count_failures_fall_back_to_one_supervised_task(self):
+        pool = SupervisedPool(2, timeout=1)
+        paths = ['hangs.pdf', 'crashes.pdf', 'fine.pdf', 'notes.txt']
+        with mock.patch.object(process, 'count_pdf_pages', misbehaving_page_count):
+            page_counts = process.count_pdf_pages_supervised(paths, pool)
+        self.assertEqual(page_counts, {'hangs.pdf': 0, 'crashes.pdf': 0, 'fine.pdf': 120})
+        self.assertEqual(process.plan_extraction_tasks('hangs.pdf', 50, page_counts['hangs.pdf']), [('hangs.pdf', None)])
+        self.assertEqual(process.plan_extraction_tasks('fine.pdf', 50, page_counts['fine.pdf']),
+                         [('fine.pdf', (0, 50)), ('fine.pdf', (50, 100)), ('fine.pdf', (100, 120))])
+
+    def test_real_pdf_is_counted_under_supervision(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'specification.pdf')
+            write_blank_pdf(path, 7)
+            self.assertEqual(process.count_pdf_pages_supervised([path], SupervisedPool(2), 'pdfium'), {path: 7})
+
+    def test_failed_page_range_fails_the_whole_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            documents = os.path.join(folder, 'documents')
+            os.makedirs(documents)
+            write_blank_pdf(os.path.join(documents, 'specification.pdf'), 7)
+            cache_dir = os.path.join(folder, 'cache')
+            with mock.patch.object(process, 'iter_pdfplumber_page_texts', failing_middle_range):
+                summary = process.process_folder(documents, os.path.join(folder, 'out'), min_words=5, workers=2,
+                                                 pdf_pages_per_task=3, cache_dir=cache_dir)
+            self.assertEqual([file for file, _ in summary["failed_files"]], ['specification.pdf'])
+            self.assertIn("broken content stream", summary["failed_files"][0][1])
+            self.assertEqual(summary["paragraphs"], 0)
+            self.assertEqual([name for root, _, files in os.walk(cache_dir) if not root.endswith('folders')
+                              for name in files if name.endswith('.json')], [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_retrievers.py
+
+import os
+import sys
+import random
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import runner
+from documentretriever.unified_retriever import UnifiedRetriever
+from documentretriever.retrievers import fuzzy, analysis
+
+VOCABULARY = ("payment terms liability supplier obligations delivery goods invoice warranty breach notice "
+              "termination insurance audit subcontractor confidentiality indemnity").split()
+
+def corpus(paragraphs=200, queries=40, seed=3):
+    rng = random.Random(seed)
+    documents = [{"id": i, "text": " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 30))) + f" clause {i}"}
+                 for i in range(paragraphs)]
+    clauses = {str(i): {"Clause": " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(2, 8)))}
+               for i in range(queries)}
+    return documents, clauses
+
+class NativeRetrieverParityTest(unittest.TestCase):
+    """retrieve() one query at a time and retrieve_batch() must give the same rankings."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.documents, cls.clauses = corpus()
+        cls.retriever = UnifiedRetriever(cls.documents, load_existing=True)
+
+    def assert_batch_matches_single(self, method, k=5, min_threshold=0):
+        batch = self.retriever.retrieve_batch(self.clauses, [method], k=k, batch_size=16, min_threshold=min_threshold)
+        for clause_id, clause in self.clauses.items():
+            single = self.retriever.retrieve(clause, method, k=k, min_threshold=min_threshold)
+            self.assertEqual(single, batch[clause_id][method], f"{method}, clause {clause_id}")
+        self.assertTrue(any(batch[clause_id][method][0] for clause_id in self.clauses))
+
+    def test_bm25(self):
+        self.assert_batch_matches_single("bm25")
+        self.assert_batch_matches_single("bm25", min_threshold=20)
+
+    def test_flash(self):
+        self.assert_batch_matches_single("flash")
+        self.assert_batch_matches_single("flash", min_threshold=50)
+
+    def test_flash_honours_k(self):
+        rankings = self.retriever.retrieve_batch(self.clauses, ["flash"], k=3)
+        self.assertTrue(all(len(rankings[clause_id]["flash"][0]) <= 3 for clause_id in self.clauses))
+
+    def test_fuzz(self):
+        self.assert_batch_matches_single("fuzz")
+        self.assert_batch_matches_single("fuzz", min_threshold=60)
+
+class FuzzThreadBudgetTest(unittest.TestCase):
+    def test_fuzz_follows_the_lane_thread_budget(self):
+        documents, clauses = corpus(60, 5)
+        retriever = UnifiedRetriever(documents, load_existing=True)
+        cpdist = fuzzy.process.cpdist
+
+        def budgets(methods, workers):
+            seen = set()
+            def recording_cpdist(*args, **kwargs):
+                seen.add(kwargs["workers"])
+                return cpdist(*args, **kwargs)
+            with mock.patch.object(fuzzy.process, 'cpdist', recording_cpdist):
+                runner.process_queries(retriever, clauses, methods, k=3, workers=workers)
+            return seen
+
+        # Four sparse lanes on eight cores get two each; fuzz alone gets all of them
+        self.assertEqual(budgets(["bm25", "fuzz", "tfidf", "lunr"], 8), {2})
+        self.assertEqual(budgets(["fuzz"], 3), {3})
+
+    def test_fuzz_uses_every_core_without_a_budget(self):
+        documents, _ = corpus(30, 0)
+        self.assertEqual(fuzzy.FuzzRetriever("id", ["text"], documents).workers, -1)
+
+class ClearedAfterWrite(dict):
+    """A query memo that another lane clears right after every write."""
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.clear()
+
+class AnalyzerThreadSafetyTest(unittest.TestCase):
+    def test_memo_cleared_by_another_lane(self):
+        _, clauses = corpus(0, 20)
+        texts = [clause["Clause"] for clause in clauses.values()]
+        analyzer = analysis.Analyzer()
+        expected = [" ".join(analyzer.tokens(text)) for text in texts]
+        analyzer._queries = ClearedAfterWrite()
+        self.assertEqual(analyzer.analyze(texts), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_runner.py
+
+import os
+import sys
+import json
+import tempfile
+import textwrap
+import unittest
+import subprocess
+
+RETRIEVALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs in a fresh interpreter, so that nothing imported by other tests hides a dense import
+FRESH_SPARSE_PROJECT = textwrap.dedent("""
+    import sys, json
+    import runner
+    retriever = runner.load_retriever(sys.argv[1], methods=["bm25", "fuzz"])
+    results = retriever.retrieve_batch({"q": "payment terms"}, ["bm25", "fuzz"], k=3)
+    heavy = sorted({"torch", "faiss", "sentence_transformers"} & set(sys.modules))
+    print(json.dumps({"heavy": heavy, "built": sorted(retriever.other_retrievers),
+                      "dense": sorted(retriever.indexes), "results": results}))
+""")
+
+# The web app's run: every method, with the analysis threshold pushed down
+THRESHOLD_RUN = textwrap.dedent("""
+    import sys, json
+    import runner
+    methods = ["bm25", "dpr", "lunr", "encoder", "flash"]
+    results = runner.process_queries(runner.load_retriever(sys.argv[1], methods=runner.reachable_methods(methods, 10)),
+                                     {"q": "payment terms delivery"}, methods, k=3, workers=2, min_threshold=10)
+    heavy = sorted({"torch", "faiss", "sentence_transformers"} & set(sys.modules))
+    print(json.dumps({"heavy": heavy, "results": results}))
+""")
+
+class LoadRetrieverTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.processed_docs = os.path.join(self.tmp.name, 'extracted_data.jsonl')
+        with open(self.processed_docs, 'w') as f:
+            for i in range(40):
+                f.write(json.dumps({"id": i, "text": f"paragraph {i} about payment terms and delivery {i % 3}",
+                                    "source": "terms.txt"}) + "\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_fresh_project(self, script=FRESH_SPARSE_PROJECT):
+        result = subprocess.run([sys.executable, '-c', script, self.processed_docs], cwd=RETRIEVALS_DIR,
+                                capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': RETRIEVALS_DIR})
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_sparse_only_new_project_does_not_import_dense_stack(self):
+        report = self.run_fresh_project()
+        self.assertEqual(report["heavy"], [])
+        self.assertEqual(report["built"], ["bm25", "fuzz"])
+        self.assertEqual(report["dense"], [])
+        self.assertTrue(report["results"]["q"]["bm25"][0])
+        self.assertTrue(report["results"]["q"]["fuzz"][0])
+
+    def test_sparse_only_index_is_saved_and_reused(self):
+        self.run_fresh_project()
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, 'unified_index.sparse')))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'unified_index.dpr.faiss')))
+        # The second run loads the saved sparse indexes instead of building the dense ones
+        self.assertEqual(self.run_fresh_project()["heavy"], [])
+
+    def test_methods_that_cannot_reach_the_threshold_are_skipped(self):
+        report = self.run_fresh_project(THRESHOLD_RUN)
+        self.assertEqual(report["heavy"], [])
+        results = report["results"]["q"]
+        self.assertEqual(list(results), ["bm25", "dpr", "lunr", "encoder", "flash"])
+        self.assertEqual((results["dpr"], results["encoder"]), ([], []))
+        self.assertTrue(results["flash"][0])
+        self.assertTrue(all(document["similarity"] * 100 >= 10 for document in results["bm25"][0]))
+
+if __name__ == "__main__":
+    unittest.main()
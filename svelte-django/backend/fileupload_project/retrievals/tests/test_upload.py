@@ -0,0 +1,50 @@
+# tests/test_upload.py
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+RETRIEVALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(RETRIEVALS_DIR, 'documentretriever'))
+
+from upload import BlobStore
+
+class BlobStoreIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.blob_dir = os.path.join(self.tmp.name, 'blobs')
+        self.files = []
+        for i in range(3):
+            file_path = os.path.join(self.tmp.name, f"file_{i}.txt")
+            with open(file_path, 'w') as f:
+                f.write(f"contents {i}")
+            self.files.append(file_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def saved_index(self):
+        with open(os.path.join(self.blob_dir, 'index.json')) as f:
+            return json.load(f)
+
+    def test_save_drops_deleted_and_modified_files(self):
+        store = BlobStore(self.blob_dir)
+        for file_path in self.files:
+            store.add(file_path)
+        store.save_index()
+        self.assertEqual(len(self.saved_index()), 3)
+
+        os.remove(self.files[0])
+        with open(self.files[1], 'a') as f:
+            f.write(" and more")
+        store = BlobStore(self.blob_dir)
+        store.add(self.files[1])
+        store.save_index()
+        index = self.saved_index()
+        self.assertEqual(sorted(index), sorted(BlobStore._stat_key(file_path) for file_path in self.files[1:]))
+        self.assertEqual(index[BlobStore._stat_key(self.files[1])], store.hash_file(self.files[1]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+# tests/test_worker.py
+
+import os
+import sys
+import stat
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import worker
+
+class WorkerSocketTest(unittest.TestCase):
+    def test_socket_is_created_owner_only(self):
+        old_umask = os.umask(0)
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                socket_path = os.path.join(folder, 'worker.sock')
+                server = worker.WorkerServer(socket_path, worker=None)
+                try:
+                    self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+                finally:
+                    server.server_close()
+        finally:
+            os.umask(old_umask)
+        self.assertEqual(os.umask(old_umask), old_umask)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+# worker.py
+#
+# Long-lived retrieval worker. It keeps the sentence-transformer models and the indexes of recently
+# used projects in memory, and runs the process, index, retrieve and analyse jobs that the Django views
+# send over a Unix socket. Each project run therefore skips the 10-30 s start-up of fresh interpreters
+# that import torch and load three models.
+#
+#   python3 worker.py --socket /path/to/retrieval_worker.sock --mmap_index
+#
+# Protocol: the client sends one JSON line {"job": ..., "args": {...}}. While the job runs, the worker
+# streams {"event": "log", ...} lines, and finishes with {"event": "result", "result": ...} or
+# {"event": "error", "error": ...}. See worker_client.py.
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+import socketserver
+import multiprocessing
+from collections import OrderedDict
+
+# Add the current directory to the Python path, and documentretriever for process.py's own imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'documentretriever'))
+
+import runner
+import analyser
+from documentretriever.retrievers.embeddings import DPR_CONTEXT_MODEL, DPR_QUESTION_MODEL, MPNET_MODEL
+from documentretriever.retrievers.embedding_cache import DEFAULT_MAX_SIZE_MB
+from worker_client import WorkerClient, WorkerUnavailable, default_socket_path
+
+class JobLogHandler(logging.Handler):
+    """Forwards the records logged by the thread running a job to the client that sent it."""
+
+    def __init__(self, send, thread_id):
+        super().__init__(logging.INFO)
+        self.send = send
+        self.thread_id = thread_id
+
+    def emit(self, record):
+        if record.thread != self.thread_id:
+            return
+        try:
+            self.send({"event": "log", "level": record.levelname, "message": record.getMessage()})
+        except OSError:
+            # The client went away; the job still runs to completion
+            pass
+
+class RetrievalWorker:
+    def __init__(self, embedding_service, max_projects=4, mmap_index=False, workers=None):
+        self.embedding_service = embedding_service
+        self.max_projects = max_projects
+        self.mmap_index = mmap_index
+        self.workers = workers
+        self.started_at = time.time()
+        self.retrievers = OrderedDict()
+        # The models, torch's thread settings and the loaded indexes are shared by all jobs,
+        # so index and retrieve jobs run one at a time
+        self._dense_lock = threading.Lock()
+
+    def preload(self):
+        start_time = time.perf_counter()
+        for model_name in (DPR_CONTEXT_MODEL, DPR_QUESTION_MODEL, MPNET_MODEL):
+            self.embedding_service.model(model_name)
+        logging.info(f"Loaded the embedding models in {time.perf_counter() - start_time:.1f}s")
+
+    def retriever(self, processed_docs, index_type="auto", methods=None):
+        """Returns the project's retriever, reloading it when its extracted data changed on disk."""
+        key = os.path.realpath(processed_docs)
+        stat = os.stat(key)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if key in self.retrievers and self.retrievers[key][0] == version:
+            self.retrievers.move_to_end(key)
+            logging.info(f"Reusing the loaded index of {processed_docs}")
+            return self.retrievers[key][1]
+
+        retriever = runner.load_retriever(processed_docs, self.embedding_service, index_type, self.mmap_index, methods)
+        if retriever is None:
+            raise ValueError(f"No documents could be loaded from {processed_docs}")
+        self.retrievers[key] = (version, retriever)
+        self.retrievers.move_to_end(key)
+        while len(self.retrievers) > self.max_projects:
+            evicted, _ = self.retrievers.popitem(last=False)
+            logging.info(f"Unloaded the index of {evicted}")
+        return retriever
+
+    def run(self, job, args):
+        jobs = {
+            "ping": self.ping,
+            "process": self.process,
+            "index": self.index,
+            "retrieve": self.retrieve,
+            "analyse": self.analyse,
+        }
+        if job not in jobs:
+            raise ValueError(f"Unknown job: {job}")
+        return jobs[job](**args)
+
+    def ping(self):
+        return {"pid": os.getpid(), "uptime": time.time() - self.started_at, "projects": list(self.retrievers)}
+
+    def process(self, folder_path, **options):
+        # Imported on first use: the PDF libraries are only needed by this job
+        import process
+        return process.process_folder(folder_path, **options)
+
+    def index(self, processed_docs, index_type="auto"):
+        with self._dense_lock:
+            retriever = self.retriever(processed_docs, index_type)
+        return {"index_path": str(runner.index_path_for(processed_docs)), "documents": len(retriever.documents)}
+
+    def retrieve(self, processed_docs, methods=("bm25",), k=5, query_file=None, output_dir=None,
+                 index_type="auto", include_results=False, min_threshold=0):
+        with self._dense_lock:
+            retriever = self.retriever(processed_docs, index_type, runner.reachable_methods(methods, min_threshold))
+            results = runner.main(processed_docs, list(methods), k, query_file, output_dir,
+                                  workers=self.workers, retriever=retriever, min_threshold=min_threshold)
+        summary = {"output_file": os.path.abspath(runner.results_path(output_dir)), "queries": len(results)}
+        if include_results:
+            summary["results"] = results
+        return summary
+
+    def analyse(self, file_path, output_path, project_folder, **options):
+        return analyser.analyse(file_path, output_path, project_folder, **options)
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        send_lock = threading.Lock()
+
+        def send(message):
+            with send_lock:
+                self.wfile.write((json.dumps(message, cls=runner.NumpyEncoder) + "\n").encode('utf-8'))
+                self.wfile.flush()
+
+        try:
+            request = json.loads(self.rfile.readline())
+            job, args = request["job"], request.get("args") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            send({"event": "error", "error": f"Invalid request: {e}"})
+            return
+
+        log_handler = JobLogHandler(send, threading.get_ident())
+        logging.getLogger().addHandler(log_handler)
+        start_time = time.perf_counter()
+        try:
+            logging.info(f"Starting {job} job")
+            reply = {"event": "result", "result": self.server.worker.run(job, args)}
+            logging.info(f"Finished {job} job in {time.perf_counter() - start_time:.2f}s")
+        except Exception as e:
+            logging.exception(f"The {job} job failed")
+            reply = {"event": "error", "error": f"{type(e).__name__}: {e}"}
+        finally:
+            logging.getLogger().removeHandler(log_handler)
+
+        try:
+            send(reply)
+        except OSError:
+            logging.warning(f"Could not send the result of the {job} job; the client disconnected")
+
+class WorkerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, worker):
+        self.worker = worker
+        super().__init__(socket_path, JobHandler)
+
+    def server_bind(self):
+        # bind creates the socket file with the umask's permissions: only the owner may ever connect to it
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+def preload_forkserver():
+    """
+    Forks the extraction workers from a server that has already imported this module and process.py.
+    Every extraction task runs in a new process, and without the preload each one re-imports them, with
+    pdfplumber, numpy and the rest of their dependencies. The server does not inherit this process's
+    sys.path additions, so it finds the modules through PYTHONPATH.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    os.environ['PYTHONPATH'] = os.pathsep.join(
+        path for path in (here, os.path.join(here, 'documentretriever'), os.environ.get('PYTHONPATH')) if path)
+    multiprocessing.set_start_method('forkserver')
+    # '__main__' is not enough: the forkserver does not preload the main script, so it is named as 'worker'
+    multiprocessing.set_forkserver_preload(['worker', 'process'])
+
+def claim_socket(socket_path):
+    """Removes a socket file left behind by a worker that is no longer running."""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        WorkerClient(socket_path, connect_timeout=1).run("ping")
+    except WorkerUnavailable:
+        os.unlink(socket_path)
+        return
+    raise SystemExit(f"A retrieval worker is already listening on {socket_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve process, index, retrieve and analyse jobs with warm models.")
+    parser.add_argument("--socket", type=str, default=default_socket_path(), help="Path of the Unix socket (default: $DOCUMENTRETRIEVER_WORKER_SOCKET or backend/retrieval_worker.sock)")
+    parser.add_argument("--max_projects", type=int, default=4, help="Number of project indexes kept loaded")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Cores shared by the retrieval methods of a retrieve job")
+    parser.add_argument("--mmap_index", action='store_true', help="Memory-map saved indexes instead of reading them into RAM")
+    parser.add_argument("--no_preload", action='store_true', help="Load the embedding models on the first job instead of at start-up")
+    parser.add_argument("--embedding_cache_dir", type=str, help="Directory of the persistent embedding cache")
+    parser.add_argument("--embedding_cache_mb", type=float, help=f"Size limit of the embedding cache in MB (default: {DEFAULT_MAX_SIZE_MB})")
+    parser.add_argument("--no_embedding_cache", action='store_true', help="Encode every paragraph instead of reusing cached embeddings")
+    args = parser.parse_args()
+
+    # Extraction workers must not be forked from this multi-threaded process that holds torch's thread pools
+    preload_forkserver()
+
+    embedding_service = runner.create_embedding_service(args.embedding_cache_dir, args.embedding_cache_mb, not args.no_embedding_cache)
+    worker = RetrievalWorker(embedding_service, args.max_projects, args.mmap_index, args.workers)
+    if not args.no_preload:
+        worker.preload()
+
+    claim_socket(args.socket)
+    server = WorkerServer(args.socket, worker)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logging.info(f"Retrieval worker {os.getpid()} listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        logging.info("Retrieval worker stopped")
+
+if __name__ == "__main__":
+    main()
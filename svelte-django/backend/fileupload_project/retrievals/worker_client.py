@@ -0,0 +1,70 @@
+# worker_client.py
+#
+# Client of the retrieval worker (worker.py). It only uses the standard library, so the Django views
+# can import it without loading any of the retrieval dependencies.
+
+import os
+import json
+import socket
+
+SOCKET_ENV = "DOCUMENTRETRIEVER_WORKER_SOCKET"
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'retrieval_worker.sock')
+JOBS = ("ping", "process", "index", "retrieve", "analyse")
+
+class WorkerUnavailable(Exception):
+    """No worker is listening on the socket; the caller should run the job itself."""
+
+class WorkerError(Exception):
+    """The worker accepted the job but it failed."""
+
+def default_socket_path():
+    return os.environ.get(SOCKET_ENV, DEFAULT_SOCKET)
+
+class WorkerClient:
+    def __init__(self, socket_path=None, connect_timeout=5):
+        self.socket_path = socket_path or default_socket_path()
+        self.connect_timeout = connect_timeout
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise WorkerUnavailable(f"No retrieval worker at {self.socket_path}: {e}")
+        # Jobs such as extraction can legitimately run for a long time
+        sock.settimeout(None)
+        return sock
+
+    def stream(self, job, **args):
+        """Sends a job and yields the events the worker streams back, ending with its result or error."""
+        if job not in JOBS:
+            raise ValueError(f"Unknown job: {job}")
+        with self._connect() as sock:
+            sock.sendall((json.dumps({"job": job, "args": args}) + "\n").encode('utf-8'))
+            with sock.makefile('r', encoding='utf-8') as reader:
+                for line in reader:
+                    event = json.loads(line)
+                    yield event
+                    if event["event"] in ("result", "error"):
+                        return
+        raise WorkerError(f"The retrieval worker closed the connection during the {job} job")
+
+    def run(self, job, on_log=None, **args):
+        """Runs a job and returns its result; log events are passed to on_log(message) as they arrive."""
+        for event in self.stream(job, **args):
+            if event["event"] == "log":
+                if on_log:
+                    on_log(f"[worker] {event['message']}")
+            elif event["event"] == "error":
+                raise WorkerError(event["error"])
+            elif event["event"] == "result":
+                return event["result"]
+
+    def is_available(self):
+        try:
+            self.run("ping")
+            return True
+        except (WorkerUnavailable, WorkerError):
+            return False